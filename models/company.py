@@ -121,10 +121,4 @@ class Company(db.Model):
     
     def get_full_address(self):
         """Get formatted full address"""
-        address_parts = [
-            self.address,
-            self.city,
-            self.state,
-            self.pincode
-        ]
-        return ', '.join(part for part in address_parts if part)
\ No newline at end of file
+        return ', '.join(filter(None, (self.address, self.city, self.state, self.pincode)))
\ No newline at end of file
@@ -109,13 +109,7 @@ class Customer(db.Model):
     
     def get_full_address(self):
         """Get formatted full address"""
-        address_parts = [
-            self.address,
-            self.city,
-            self.state,
-            self.pincode
-        ]
-        return ', '.join(part for part in address_parts if part)
+        return ', '.join(filter(None, (self.address, self.city, self.state, self.pincode)))
     
     def get_display_name(self):
         """Get display name with contact person if available"""
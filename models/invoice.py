@@ -4,12 +4,22 @@ Represents invoice and its items for the invoice management system
 """
 
 from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
 from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Numeric, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 # Import shared db instance
 from database import db
 
+# GST rate applied to invoice subtotals (18% as per terms) and the precision money is rounded to
+GST_RATE = Decimal('0.18')
+CENT = Decimal('0.01')
+_AMOUNT_FMT = '₹{:.2f}'.format
+
+def _to_decimal(value):
+    """Convert a numeric column value (Decimal, float, int or numeric string) to Decimal"""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
 class Invoice(db.Model):
     """Invoice model for storing invoice information"""
     
@@ -143,18 +153,15 @@ class Invoice(db.Model):
     
     def calculate_totals(self):
         """Calculate invoice totals from items"""
-        subtotal = 0
-        
         # Get current items from database to ensure we have all current items
-        from database import db
         current_items = db.session.query(InvoiceItem).filter_by(invoice_id=self.id).all()
+        subtotal = sum(
+            (_to_decimal(item.amount) for item in current_items if item.amount),
+            Decimal('0')
+        ).quantize(CENT, ROUND_HALF_UP)
         
-        for item in current_items:
-            if item.amount:
-                subtotal += float(item.amount)
-        
-        # Calculate GST (18% as per terms)
-        gst_amount = subtotal * 0.18
+        # Calculate GST (18% as per terms), rounding each stored amount once
+        gst_amount = (subtotal * GST_RATE).quantize(CENT, ROUND_HALF_UP)
         total_amount = subtotal + gst_amount
         
         self.subtotal = subtotal
@@ -185,10 +192,9 @@ class Invoice(db.Model):
         return False
     
     @staticmethod
-    def generate_invoice_number():
-        """Generate next invoice number"""
-        from datetime import datetime
-        today = datetime.now()
+    def generate_invoice_number(now=None):
+        """Generate next invoice number for the month of now (defaults to the current time)"""
+        today = now or datetime.now()
         prefix = f"INV-{today.year}-{today.month:02d}-"
         
         # Get last invoice number for this month
@@ -241,6 +247,15 @@ class InvoiceItem(db.Model):
     def __repr__(self):
         return f'<InvoiceItem {self.description}>'
     
+    # Set when quantity, rate or discount change after the amount was last calculated
+    _amount_stale = False
+    
+    @validates('quantity', 'rate', 'discount_percent')
+    def _mark_amount_stale(self, key, value):
+        """Flag the stored amount for recalculation when one of its inputs changes"""
+        self._amount_stale = True
+        return value
+    
     def to_dict(self):
         """Convert invoice item object to dictionary"""
         return {
@@ -290,19 +305,23 @@ class InvoiceItem(db.Model):
         
         return errors
     
-    def calculate_amount(self):
-        """Calculate amount for this item"""
+    def calculate_amount(self, force=False):
+        """Calculate amount for this item, reusing the stored amount if its inputs are unchanged unless force is set"""
+        if self.amount is not None and not self._amount_stale and not force:
+            return self.amount
+        
         if self.quantity and self.rate:
-            base_amount = float(self.quantity) * float(self.rate)
-            discount_amount = base_amount * (float(self.discount_percent or 0) / 100)
-            self.amount = base_amount - discount_amount
+            base_amount = _to_decimal(self.quantity) * _to_decimal(self.rate)
+            discount_amount = base_amount * _to_decimal(self.discount_percent or 0) / 100
+            self.amount = (base_amount - discount_amount).quantize(CENT, ROUND_HALF_UP)
         else:
-            self.amount = 0
+            self.amount = Decimal('0.00')
+        self._amount_stale = False
         
         return self.amount
     
     def get_formatted_amount(self):
         """Get formatted amount string"""
         if self.amount:
-            return f"₹{self.amount:.2f}"
+            return _AMOUNT_FMT(self.amount)
         return "₹0.00"
\ No newline at end of file
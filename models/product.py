@@ -9,6 +9,8 @@ from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric
 # Import shared db instance
 from database import db
 
+_RATE_FMT = '₹{:.2f} per {}'.format
+
 class Product(db.Model):
     """Product model for storing product information"""
     
@@ -97,7 +99,7 @@ class Product(db.Model):
     def get_formatted_rate(self):
         """Get formatted rate string"""
         if self.rate:
-            return f"₹{self.rate:.2f} per {self.unit}"
+            return _RATE_FMT(self.rate, self.unit)
         return "Rate not set"
     
     @staticmethod
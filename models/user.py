@@ -4,12 +4,22 @@ Represents user authentication and authorization for the invoice system
 """
 
 from datetime import datetime
+from flask import current_app, has_app_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, create_refresh_token
 
 # Import shared db instance
 from database import db
 
+# Werkzeug hash method for new passwords; stored hashes record their own method, so old ones keep verifying
+PASSWORD_HASH_METHOD = 'pbkdf2'
+
+def _password_hash_method():
+    """Get the hash method for new passwords; only a TESTING app may lower it via its PASSWORD_HASH_METHOD config"""
+    if has_app_context() and current_app.config.get('TESTING'):
+        return current_app.config.get('PASSWORD_HASH_METHOD', PASSWORD_HASH_METHOD)
+    return PASSWORD_HASH_METHOD
+
 class User(db.Model):
     """User model for authentication and authorization"""
     
@@ -54,7 +64,7 @@ class User(db.Model):
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=_password_hash_method())
     
     def check_password(self, password):
         """Check password against hash"""
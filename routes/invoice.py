@@ -488,9 +488,9 @@ def calculate_invoice_totals(invoice_id):
         if not invoice:
             return jsonify({'error': 'Invoice not found'}), 404
         
-        # Recalculate all item amounts
+        # Recalculate all item amounts, including ones stored out of step with their inputs
         for item in invoice.items:
-            item.calculate_amount()
+            item.calculate_amount(force=True)
         
         # Calculate invoice totals
         invoice.calculate_totals()
@@ -12,6 +12,9 @@ from datetime import datetime
 
 product_bp = Blueprint('product', __name__)
 
+# Header row of the CSV export, shared by every request
+CSV_EXPORT_HEADERS = ('ID', 'Category', 'Name', 'Description', 'Unit', 'Rate', 'HSN Code', 'Created At')
+
 @product_bp.route('', methods=['GET'])
 @jwt_required()
 def get_products():
@@ -358,14 +361,26 @@ def bulk_update_products():
         updated_count = 0
         errors = []
         
+        # Load every referenced product in one query; keyed by str so ids sent as strings match too
+        product_ids = {product_data.get('id') for product_data in data['products']
+                       if isinstance(product_data, dict) and product_data.get('id')}
+        products_by_id = {
+            str(product.id): product for product in Product.query.filter(Product.id.in_(product_ids))
+        } if product_ids else {}
+        
         for product_data in data['products']:
+            product_id = None
             try:
+                if not isinstance(product_data, dict):
+                    errors.append({'product': product_data, 'error': 'Product data must be an object'})
+                    continue
+                
                 product_id = product_data.get('id')
                 if not product_id:
                     errors.append({'product': product_data, 'error': 'Product ID is required'})
                     continue
                 
-                product = Product.query.get(product_id)
+                product = products_by_id.get(str(product_id))
                 if not product:
                     errors.append({'product_id': product_id, 'error': 'Product not found'})
                     continue
@@ -416,13 +431,9 @@ def export_products():
         products = Product.query.all()
         
         # Prepare CSV data
-        csv_data = []
-        csv_data.append([
-            'ID', 'Category', 'Name', 'Description', 'Unit', 'Rate', 'HSN Code', 'Created At'
-        ])
-        
-        for product in products:
-            csv_data.append([
+        csv_data = [CSV_EXPORT_HEADERS]
+        csv_data.extend(
+            (
                 product.id,
                 product.category or '',
                 product.name,
@@ -431,7 +442,9 @@ def export_products():
                 float(product.rate) if product.rate else 0,
                 product.hsn_code or '',
                 product.created_at.strftime('%Y-%m-%d %H:%M:%S') if product.created_at else ''
-            ])
+            )
+            for product in products
+        )
         
         return jsonify({
             'csv_data': csv_data,
@@ -31,7 +31,7 @@ def run_unit_tests():
 
 def run_route_tests():
     """Run route tests only"""
-    cmd = "python -m pytest tests/test_*_routes.py -v --tb=short"
+    cmd = "python -m pytest tests/test_*_routes.py -n auto --dist loadfile -v --tb=short"
     return run_command(cmd, "Route Tests (API Endpoints)")
 
 def run_integration_tests():
@@ -41,7 +41,7 @@ def run_integration_tests():
 
 def run_all_tests():
     """Run all tests with coverage"""
-    cmd = "python -m pytest tests/ -v --cov=models --cov=routes --cov=utils --cov=app --cov-report=html --cov-report=term-missing"
+    cmd = "python -m pytest tests/ -v --runslow --cov=models --cov=routes --cov=utils --cov=app --cov-report=html --cov-report=term-missing"
     return run_command(cmd, "All Tests with Coverage")
 
 def run_fast_tests():
@@ -51,9 +51,19 @@ def run_fast_tests():
 
 def run_slow_tests():
     """Run slow tests only"""
-    cmd = 'python -m pytest tests/ -v -m "slow" --tb=short'
+    cmd = 'python -m pytest tests/ -v -m "slow" --runslow --tb=short'
     return run_command(cmd, "Slow Tests Only")
 
+def run_changed_tests():
+    """Run only tests affected by changes since the last testmon run"""
+    cmd = "python -m pytest tests/ -v --testmon --tb=short"
+    return run_command(cmd, "Changed Tests Only (testmon)")
+
+def run_failed_tests():
+    """Re-run tests that failed last time first, then the rest"""
+    cmd = "python -m pytest tests/ -v --lf --ff --tb=short"
+    return run_command(cmd, "Last Failed Tests First")
+
 def run_specific_test(test_path):
     """Run a specific test file or test function"""
     cmd = f"python -m pytest {test_path} -v --tb=short"
@@ -90,12 +100,12 @@ def run_performance_tests():
 
 def generate_test_report():
     """Generate comprehensive test report"""
-    cmd = "python -m pytest tests/ --html=reports/test_report.html --self-contained-html --cov=models --cov=routes --cov=utils --cov=app --cov-report=html:reports/coverage"
+    cmd = "python -m pytest tests/ --runslow --html=reports/test_report.html --self-contained-html --cov=models --cov=routes --cov=utils --cov=app --cov-report=html:reports/coverage"
     return run_command(cmd, "Test Report Generation")
 
 def run_parallel_tests():
     """Run tests in parallel"""
-    cmd = "python -m pytest tests/ -n auto -v --tb=short"
+    cmd = "python -m pytest tests/ -n auto --dist loadscope -v --tb=short"
     return run_command(cmd, "Parallel Test Execution")
 
 def run_continuous_integration():
@@ -172,7 +182,7 @@ def main():
     parser = argparse.ArgumentParser(description="Invoice Management System Test Runner")
     parser.add_argument("--mode", choices=[
         "unit", "routes", "integration", "all", "fast", "slow", "quality", 
-        "performance", "report", "parallel", "ci", "clean"
+        "performance", "report", "parallel", "ci", "changed", "failed", "clean"
     ], default="all", help="Test execution mode")
     parser.add_argument("--test", help="Run specific test file or function")
     parser.add_argument("--markers", nargs="+", help="Run tests with specific markers")
@@ -216,6 +226,8 @@ def main():
         "report": generate_test_report,
         "parallel": run_parallel_tests,
         "ci": run_continuous_integration,
+        "changed": run_changed_tests,
+        "failed": run_failed_tests,
         "clean": clean_test_artifacts
     }
     
@@ -4,95 +4,304 @@ Pytest configuration for the invoice management system tests
 """
 
 import pytest
+import contextlib
+import functools
+import itertools
+import logging
 import os
+import socket
 import tempfile
 from datetime import datetime, date
+from decimal import Decimal
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from flask.testing import FlaskClient
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, create_access_token
+from flask_sqlalchemy.query import Query
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
+from werkzeug.datastructures import ImmutableDict
+
+# orjson is an optional speedup for JSON encoding/decoding in tests
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import your app components
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Give every pytest-xdist worker its own database; must be set before the app is imported
+WORKER_ID = os.environ.get('PYTEST_XDIST_WORKER', 'master')
+if os.environ.get('TEST_DB_FILE') == '1':
+    # File-backed database, useful for inspecting test data after a run
+    TEST_DB_PATH = os.path.join(tempfile.gettempdir(), f'invoice_test_{WORKER_ID}.db')
+    TEST_DATABASE_URL = f'sqlite:///{TEST_DB_PATH}'
+    if os.path.exists(TEST_DB_PATH):
+        os.unlink(TEST_DB_PATH)
+else:
+    # In-memory database; Flask-SQLAlchemy shares its single connection through a StaticPool.
+    # Each xdist worker is its own process, so every worker gets a private database.
+    TEST_DB_PATH = None
+    TEST_DATABASE_URL = 'sqlite://'
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+# Keep uploads created at app import out of the working tree
+os.environ['UPLOAD_FOLDER'] = os.path.join(tempfile.gettempdir(), f'invoice_uploads_{WORKER_ID}')
+
 from app import app as flask_app
 from database import db  # Import db from database module
 from models import User, Company, Customer, Product, Invoice, InvoiceItem  # Import models separately
 
-@pytest.fixture
-def app():
-    """Create and configure a test Flask app"""
-    # Create a temporary database file
-    db_fd, db_path = tempfile.mkstemp()
+def pytest_addoption(parser):
+    """Add the --runslow option"""
+    parser.addoption('--runslow', action='store_true', default=False,
+                     help='run tests marked as slow')
+
+def pytest_configure(config):
+    """Register custom markers"""
+    config.addinivalue_line('markers', 'slow: long multi-step integration tests')
+    config.addinivalue_line('markers', 'products: product API tests')
+    config.addinivalue_line('markers', 'api: HTTP API route tests')
+
+def pytest_collection_modifyitems(config, items):
+    """Skip slow tests unless --runslow is given or a -m expression selects them"""
+    if config.getoption('--runslow') or 'slow' in (config.getoption('-m') or ''):
+        return
+    skip_slow = pytest.mark.skip(reason='need --runslow option to run')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
+
+# Hosts tests may still connect to; anything else is refused by block_network
+LOCAL_HOSTS = frozenset({'127.0.0.1', 'localhost', '::1'})
+
+# Users that exist for the whole session, keyed by (username, role)
+SESSION_USERS = {
+    ('testuser', 'user'): {
+        'email': 'test@example.com',
+        'password': 'testpass123',
+        'first_name': 'Test',
+        'last_name': 'User'
+    },
+    ('admin', 'admin'): {
+        'email': 'admin@example.com',
+        'password': 'adminpass123',
+        'first_name': 'Admin',
+        'last_name': 'User',
+        'is_admin': True
+    }
+}
+
+@functools.lru_cache(maxsize=None)
+def session_user_id(username, role):
+    """Insert a session-wide user once and return its id"""
+    user = User(username=username, **SESSION_USERS[(username, role)])
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+@functools.lru_cache(maxsize=None)
+def session_auth_headers(username, role):
+    """Sign one non-expiring token per session-wide user and reuse the header mapping"""
+    # No expiry, so a long or time-shifted session never sees the shared token lapse
+    token = create_access_token(identity=session_user_id(username, role), expires_delta=False)
+    return ImmutableDict({'Authorization': f'Bearer {token}'})
+
+@pytest.fixture(scope='session')
+def isolated_db():
+    """Provide a worker-unique database, emptied of import-time default data"""
+    with flask_app.app_context():
+        db.drop_all()
     
+    yield TEST_DB_PATH
+    
+    with flask_app.app_context():
+        db.engine.dispose()
+    if TEST_DB_PATH and os.path.exists(TEST_DB_PATH):
+        os.unlink(TEST_DB_PATH)
+
+@pytest.fixture(scope='session')
+def app(isolated_db):
+    """Create and configure a test Flask app with the schema created once per session"""
     # Configure the app for testing
     flask_app.config.update({
         'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL,
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
         'JWT_SECRET_KEY': 'test-secret-key',
-        'WTF_CSRF_ENABLED': False
+        'WTF_CSRF_ENABLED': False,
+        'PROPAGATE_EXCEPTIONS': True,
+        'DEBUG': False,
+        # Hash test passwords with a low PBKDF2 iteration count instead of the production 600,000
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000'
     })
+    if orjson is not None:
+        flask_app.json = OrjsonProvider(flask_app)
+    # Skip building INFO records (and SQL echo) on every request; warnings and errors still reach the report
+    logging.disable(logging.INFO)
     
-    # Create the database tables
     with flask_app.app_context():
+        # pysqlite emits its own BEGIN/COMMIT and breaks SAVEPOINT; let SQLAlchemy drive transactions
+        @event.listens_for(db.engine, 'connect')
+        def disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+        
+        # The test database is throwaway, so skip journaling to disk and fsync on commit
+        @event.listens_for(db.engine, 'connect')
+        def disable_sqlite_durability(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=MEMORY')
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+            cursor.close()
+        
+        @event.listens_for(db.engine, 'begin')
+        def emit_begin(connection):
+            connection.exec_driver_sql('BEGIN')
+        
+        db.engine.dispose()
+        
+        # Create the database tables and the session-wide users outside any module transaction
         db.create_all()
+        for username, role in SESSION_USERS:
+            session_user_id(username, role)
+        db.session.remove()
+        
         yield flask_app
+        # No drop_all: isolated_db discards the whole database file (or in-memory database)
         db.session.remove()
-        db.drop_all()
+    logging.disable(logging.NOTSET)
+
+@pytest.fixture(scope='session')
+def db_connection(app):
+    """Bind the session to one connection whose outer transaction is rolled back after the run"""
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    app_session = db.session
+    db.session = scoped_session(sessionmaker(
+        bind=connection,
+        query_cls=Query,
+        join_transaction_mode='create_savepoint'
+    ))
+    
+    yield connection
+    
+    db.session.remove()
+    db.session = app_session
+    transaction.rollback()
+    connection.close()
+
+@pytest.fixture(scope='session')
+def nonexistent_invoice_id(db_connection):
+    """Return an id far above any invoice or invoice item the session will create"""
+    highest = max(
+        db_connection.execute(select(func.coalesce(func.max(Invoice.id), 0))).scalar(),
+        db_connection.execute(select(func.coalesce(func.max(InvoiceItem.id), 0))).scalar()
+    )
+    return highest + 10_000_000
+
+@pytest.fixture(scope='module')
+def module_savepoint(db_connection):
+    """Wrap each module in a SAVEPOINT so module-scoped rows do not leak into other files"""
+    savepoint = db_connection.begin_nested()
+    yield db_connection
+    db.session.remove()
+    if savepoint.is_active:
+        savepoint.rollback()
+
+@pytest.fixture(autouse=True)
+def db_savepoint(app, module_savepoint):
+    """Wrap each test in a SAVEPOINT so its writes are discarded without dropping tables"""
+    savepoint = module_savepoint.begin_nested()
+    # A fresh app context per test keeps flask.g (and the JWT cached on it) from leaking between tests
+    with app.app_context():
+        yield
+    db.session.remove()
+    if savepoint.is_active:
+        savepoint.rollback()
+
+@pytest.fixture(scope='session', autouse=True)
+def block_network():
+    """Fail fast on outbound connections so no test silently waits on the network"""
+    real_connect = socket.socket.connect
+    
+    def guarded_connect(sock, address):
+        if sock.family in (socket.AF_INET, socket.AF_INET6) and address[0] not in LOCAL_HOSTS:
+            raise RuntimeError(f'Tests must not open network connections (to {address!r})')
+        return real_connect(sock, address)
     
-    # Clean up
-    os.close(db_fd)
-    os.unlink(db_path)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(socket.socket, 'connect', guarded_connect)
+        yield
 
 @pytest.fixture
+def deterministic_invoice_numbers(monkeypatch):
+    """Hand out predictable invoice numbers (INV-TEST-0001, ...) in place of the real generator"""
+    numbers = (f'INV-TEST-{n:04d}' for n in itertools.count(1))
+    monkeypatch.setattr(Invoice, 'generate_invoice_number', staticmethod(lambda now=None: next(numbers)))
+    return numbers
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, deferring to Flask's encoder for dates, Decimals and the like"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class CachedJSONResponse(flask_app.response_class):
+    """Response whose parsed JSON body is decoded once and then reused"""
+    
+    if orjson is not None:
+        # get_json() decodes through json_module.loads
+        json_module = orjson
+    
+    @functools.cached_property
+    def json(self):
+        return self.get_json()
+
+@pytest.fixture(scope='module')
 def client(app):
     """Create a test client"""
-    return app.test_client()
+    return FlaskClient(app, CachedJSONResponse, use_cookies=True)
 
 @pytest.fixture
 def runner(app):
     """Create a test runner"""
     return app.test_cli_runner()
 
+@pytest.fixture(scope='session')
+def shared_tmp_root(tmp_path_factory):
+    """One temporary root for generated files, removed with pytest's other temp dirs"""
+    return tmp_path_factory.mktemp('generated')
+
 @pytest.fixture
-def db_session(app):
-    """Create a database session for testing"""
-    with app.app_context():
-        yield db.session
+def unique_tmp(shared_tmp_root):
+    """Fresh output directory under the shared temporary root"""
+    return tempfile.mkdtemp(dir=shared_tmp_root)
+
+@pytest.fixture
+def db_session(db_savepoint):
+    """Get the database session; commits release a SAVEPOINT that is rolled back after the test"""
+    return db.session
 
 @pytest.fixture
 def sample_user(db_session):
-    """Create a sample user for testing"""
-    user = User(
-        username='testuser',
-        email='test@example.com',
-        password='testpass123',
-        first_name='Test',
-        last_name='User'
-    )
-    db_session.add(user)
-    db_session.commit()
-    return user
+    """Get the session-wide sample user"""
+    return db_session.get(User, session_user_id('testuser', 'user'))
 
 @pytest.fixture
 def sample_admin(db_session):
-    """Create a sample admin user for testing"""
-    admin = User(
-        username='admin',
-        email='admin@example.com',
-        password='adminpass123',
-        first_name='Admin',
-        last_name='User',
-        is_admin=True
-    )
-    db_session.add(admin)
-    db_session.commit()
-    return admin
+    """Get the session-wide sample admin user"""
+    return db_session.get(User, session_user_id('admin', 'admin'))
 
 @pytest.fixture
-def sample_company(db_session):
-    """Create a sample company for testing"""
+def sample_reference_rows(db_session):
+    """Create the sample company, customer and product together with a single commit"""
     company = Company(
         name='Test Company',
         address='123 Test Street',
@@ -106,13 +315,6 @@ def sample_company(db_session):
         account_number='1234567890',
         ifsc_code='TEST0123456'
     )
-    db_session.add(company)
-    db_session.commit()
-    return company
-
-@pytest.fixture
-def sample_customer(db_session):
-    """Create a sample customer for testing"""
     customer = Customer(
         name='Test Customer',
         address='456 Customer Street',
@@ -124,13 +326,6 @@ def sample_customer(db_session):
         phone='9876543210',
         email='customer@test.com'
     )
-    db_session.add(customer)
-    db_session.commit()
-    return customer
-
-@pytest.fixture
-def sample_product(db_session):
-    """Create a sample product for testing"""
     product = Product(
         category='Test Category',
         name='Test Product',
@@ -139,9 +334,24 @@ def sample_product(db_session):
         rate=100.00,
         hsn_code='1234'
     )
-    db_session.add(product)
+    db_session.add_all([company, customer, product])
     db_session.commit()
-    return product
+    return company, customer, product
+
+@pytest.fixture
+def sample_company(sample_reference_rows):
+    """Create a sample company for testing"""
+    return sample_reference_rows[0]
+
+@pytest.fixture
+def sample_customer(sample_reference_rows):
+    """Create a sample customer for testing"""
+    return sample_reference_rows[1]
+
+@pytest.fixture
+def sample_product(sample_reference_rows):
+    """Create a sample product for testing"""
+    return sample_reference_rows[2]
 
 @pytest.fixture
 def sample_invoice(db_session, sample_company, sample_customer):
@@ -158,6 +368,32 @@ def sample_invoice(db_session, sample_company, sample_customer):
         dispatch_from='Test Location'
     )
     db_session.add(invoice)
+    db_session.flush()
+    invoice_id = invoice.id
+    db_session.commit()
+    # Commit expired the instance; reload it with its relationships eager-loaded up front
+    return db_session.execute(
+        select(Invoice)
+        .where(Invoice.id == invoice_id)
+        .options(
+            selectinload(Invoice.items).selectinload(InvoiceItem.product),
+            selectinload(Invoice.customer),
+            selectinload(Invoice.company)
+        )
+    ).scalar_one()
+
+@pytest.fixture
+def mutable_invoice(db_session, sample_company_module, sample_customer_module):
+    """Create an invoice a test may modify or delete, reusing the module-scoped parent rows"""
+    invoice = Invoice(
+        invoice_number='INV-2025-03-0001',
+        invoice_date=date.today(),
+        company_id=sample_company_module.id,
+        customer_id=sample_customer_module.id,
+        po_number='PO-MUTABLE-123',
+        payment_mode='RTGS/NEFT'
+    )
+    db_session.add(invoice)
     db_session.commit()
     return invoice
 
@@ -173,15 +409,193 @@ def sample_invoice_item(db_session, sample_invoice, sample_product):
         rate=100.00,
         discount_percent=10.0
     )
-    item.calculate_amount()
+    item.amount = Decimal('450.00')  # 5 * 100 - 10% discount
+    # The stored amount matches its inputs, so later calculate_amount() calls reuse it
+    item._amount_stale = False
     db_session.add(item)
     db_session.commit()
     return item
 
+@pytest.fixture(scope='module')
+def sample_company_module(module_savepoint):
+    """Create a sample company shared by the read-only tests of a module"""
+    return persist_for_module(Company(
+        name='Module Company',
+        address='123 Module Street',
+        city='Test City',
+        state='Test State',
+        pincode='123456',
+        gstin='12MODUL3456F1Z5',
+        contact_phone='9876543210',
+        email='module_company@test.com'
+    ))
+
+@pytest.fixture(scope='module')
+def sample_customer_module(module_savepoint):
+    """Create a sample customer shared by the read-only tests of a module"""
+    return persist_for_module(Customer(
+        name='Module Customer',
+        address='456 Module Street',
+        city='Customer City',
+        state='Customer State',
+        pincode='654321',
+        gstin='12MODUL7890K1L2',
+        contact_person='Jane Doe',
+        phone='9876543210',
+        email='module_customer@test.com'
+    ))
+
+@pytest.fixture(scope='module')
+def sample_product_module(module_savepoint):
+    """Create a sample product shared by the read-only tests of a module"""
+    return persist_for_module(Product(
+        category='Module Category',
+        name='Module Product',
+        description='Module product description',
+        unit='KG',
+        rate=100.00,
+        hsn_code='4321'
+    ))
+
+@pytest.fixture(scope='module')
+def sample_invoice_module(sample_company_module, sample_customer_module):
+    """Create a sample invoice shared by the read-only tests of a module"""
+    return persist_for_module(Invoice(
+        invoice_number='INV-2025-02-0001',
+        invoice_date=date.today(),
+        company_id=sample_company_module.id,
+        customer_id=sample_customer_module.id,
+        po_number='PO-MODULE-123',
+        po_date=date.today(),
+        payment_mode='RTGS/NEFT',
+        transport='Road',
+        dispatch_from='Module Location'
+    ))
+
+@pytest.fixture(scope='module')
+def sample_invoice_item_module(sample_invoice_module, sample_product_module):
+    """Create a sample invoice item shared by the read-only tests of a module"""
+    item = InvoiceItem(
+        invoice_id=sample_invoice_module.id,
+        product_id=sample_product_module.id,
+        description='Module item',
+        quantity=5.0,
+        unit='KG',
+        rate=100.00,
+        discount_percent=10.0
+    )
+    item.calculate_amount()
+    return persist_for_module(item)
+
+@pytest.fixture(scope='class')
+def invoice_workflow(client, admin_headers, sample_company_module, sample_customer_module,
+                     sample_product_module):
+    """Run the invoice workflow once per class and keep the response of every step"""
+    responses = {}
+    
+    with client as c:
+        responses['create'] = c.post('/api/invoices', json={
+            'invoice_date': date.today().isoformat(),
+            'company_id': sample_company_module.id,
+            'customer_id': sample_customer_module.id,
+            'po_number': 'PO-WORKFLOW-123'
+        }, headers=admin_headers)
+        invoice_id = responses['create'].get_json()['invoice']['id']
+        
+        responses['add_item'] = c.post(f'/api/invoices/{invoice_id}/items', json={
+            'product_id': sample_product_module.id,
+            'description': 'Workflow item',
+            'quantity': 5.0,
+            'unit': 'KG',
+            'rate': 100.00,
+            'discount_percent': 10.0
+        }, headers=admin_headers)
+        responses['calculate'] = c.post(f'/api/invoices/{invoice_id}/calculate',
+                                        headers=admin_headers)
+        responses['status'] = c.put(f'/api/invoices/{invoice_id}/status', json={'status': 'SENT'},
+                                    headers=admin_headers)
+        responses['verify'] = c.get(f'/api/invoices/{invoice_id}', headers=admin_headers)
+    db.session.remove()
+    
+    return responses
+
+@pytest.fixture(scope='class')
+def product_workflow(client, auth_headers):
+    """Run the product CRUD flow once per class and keep the response of every step"""
+    responses = {}
+    
+    with client as c:
+        responses['create'] = c.post('/api/products', json={
+            'category': 'Workflow Category',
+            'name': 'Workflow Product',
+            'description': 'Workflow product description',
+            'unit': 'PCS',
+            'rate': 150.00,
+            'hsn_code': '5678'
+        }, headers=auth_headers)
+        product_id = responses['create'].get_json()['product']['id']
+        
+        responses['read'] = c.get(f'/api/products/{product_id}', headers=auth_headers)
+        responses['update'] = c.put(f'/api/products/{product_id}',
+                                    json={'name': 'Updated Product Name', 'rate': 250.00},
+                                    headers=auth_headers)
+        responses['search'] = c.get('/api/products/search?q=Updated', headers=auth_headers)
+        responses['validate'] = c.post(f'/api/products/{product_id}/validate', headers=auth_headers)
+        responses['by_category'] = c.get('/api/products/categories/Workflow Category',
+                                         headers=auth_headers)
+    db.session.remove()
+    
+    return responses
+
+@pytest.fixture(scope='class')
+def category_products(module_savepoint):
+    """Create three products across two categories once per class"""
+    insert_products([
+        {'name': 'Product A', 'category': 'Category A', 'rate': 100.00},
+        {'name': 'Product B', 'category': 'Category B', 'rate': 200.00},
+        {'name': 'Product C', 'category': 'Category A', 'rate': 150.00}
+    ])
+
+@pytest.fixture(scope='module')
+def error_test_invoice_id(client, auth_headers, sample_customer_module):
+    """Create one invoice per module for the error handling cases to target"""
+    response = client.post('/api/invoices', json={
+        'invoice_date': date.today().isoformat(),
+        'customer_id': sample_customer_module.id
+    }, headers=auth_headers)
+    db.session.remove()
+    
+    assert response.status_code == 201
+    return response.get_json()['invoice']['id']
+
+@pytest.fixture(scope='session')
+def auth_headers(app):
+    """Create authentication headers for the sample user, signed once per session"""
+    return session_auth_headers('testuser', 'user')
+
+@pytest.fixture(scope='session')
+def auth_environ(auth_headers):
+    """Sample user's token as a WSGI environ entry, for environ_overrides= without header encoding"""
+    return ImmutableDict({'HTTP_AUTHORIZATION': auth_headers['Authorization']})
+
+@pytest.fixture(scope='session')
+def auth_token(auth_headers):
+    """Bare JWT of the sample user, for calling views directly"""
+    return auth_headers['Authorization'].split()[1]
+
+@pytest.fixture(scope='session')
+def admin_headers(app):
+    """Create admin authentication headers for the sample admin, signed once per session"""
+    return session_auth_headers('admin', 'admin')
+
+@pytest.fixture(scope='session')
+def admin_environ(admin_headers):
+    """Sample admin's token as a WSGI environ entry, for environ_overrides= without header encoding"""
+    return ImmutableDict({'HTTP_AUTHORIZATION': admin_headers['Authorization']})
+
 @pytest.fixture
-def auth_headers(client, sample_user):
-    """Create authentication headers for testing"""
-    # Login to get token
+def fresh_auth_headers(client, sample_user):
+    """Log the sample user in for a token of its own, for tests that revoke their token"""
     response = client.post('/api/auth/login', json={
         'username': sample_user.username,
         'password': 'testpass123'
@@ -190,21 +604,62 @@ def auth_headers(client, sample_user):
     assert response.status_code == 200
     token = response.json['access_token']
     
-    return {'Authorization': f'Bearer {token}'}
+    return ImmutableDict({'Authorization': f'Bearer {token}'})
 
 @pytest.fixture
-def admin_headers(client, sample_admin):
-    """Create admin authentication headers for testing"""
-    # Login to get token
+def fresh_admin_headers(client, db_session):
+    """Create a separate admin and log in, for tests that need a user other than the session admin"""
+    admin = User(
+        username='fresh_admin',
+        email='fresh_admin@example.com',
+        password='adminpass123',
+        is_admin=True
+    )
+    db_session.add(admin)
+    db_session.commit()
+    
     response = client.post('/api/auth/login', json={
-        'username': sample_admin.username,
+        'username': 'fresh_admin',
         'password': 'adminpass123'
     })
     
     assert response.status_code == 200
     token = response.json['access_token']
     
-    return {'Authorization': f'Bearer {token}'}
+    return ImmutableDict({'Authorization': f'Bearer {token}'})
+
+@pytest.fixture(scope='module')
+def search_seed_data(module_savepoint):
+    """Seed companies, customers and products with searchable patterns once per module"""
+    companies = [
+        Company(name='Alpha Company', city='Mumbai', state='Maharashtra'),
+        Company(name='Beta Company', city='Delhi', state='Delhi'),
+        Company(name='Gamma Company', city='Bangalore', state='Karnataka')
+    ]
+    customers = [
+        Customer(name='Alpha Customer', city='Mumbai', state='Maharashtra'),
+        Customer(name='Beta Customer', city='Delhi', state='Delhi'),
+        Customer(name='Gamma Customer', city='Bangalore', state='Karnataka')
+    ]
+    products = [
+        Product(name='Alpha Product', category='Electronics', rate=100.00),
+        Product(name='Beta Product', category='Machinery', rate=200.00),
+        Product(name='Gamma Product', category='Electronics', rate=150.00)
+    ]
+    persist_for_module(*companies, *customers, *products)
+    return {'companies': companies, 'customers': customers, 'products': products}
+
+@pytest.fixture
+def invoice_data_factory(sample_customer):
+    """Build invoice payloads for the sample customer, overriding only the fields a test varies"""
+    def make(**overrides):
+        data = {
+            'invoice_date': date.today().isoformat(),
+            'customer_id': sample_customer.id
+        }
+        data.update(overrides)
+        return data
+    return make
 
 @pytest.fixture
 def sample_invoice_data():
@@ -251,17 +706,17 @@ def sample_customer_data():
         'email': 'newcustomer@test.com'
     }
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def sample_product_data():
-    """Sample product data for testing"""
-    return {
+    """Sample product data for testing; read-only, so tests that need changes take a copy()"""
+    return ImmutableDict({
         'category': 'New Category',
         'name': 'New Test Product',
         'description': 'New test product description',
         'unit': 'PCS',
         'rate': 150.00,
         'hsn_code': '5678'
-    }
+    })
 
 @pytest.fixture
 def sample_user_data():
@@ -275,6 +730,64 @@ def sample_user_data():
     }
 
 # Helper functions for tests
+def persist_for_module(*instances):
+    """Commit module-scoped rows, load their attributes and detach them from the per-test sessions"""
+    db.session.add_all(instances)
+    db.session.commit()
+    for instance in instances:
+        db.session.refresh(instance)
+        db.session.expunge(instance)
+    db.session.remove()
+    return instances[0] if len(instances) == 1 else list(instances)
+
+def insert_products(rows):
+    """Insert product rows in one executemany batch, skipping unit-of-work tracking"""
+    db.session.bulk_insert_mappings(Product, rows)
+    db.session.commit()
+    db.session.remove()
+
+@contextlib.contextmanager
+def count_queries(connection):
+    """Collect the SQL statements executed on a connection inside the block"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(connection, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, 'before_cursor_execute', record)
+
+def call_view(view_fn, json_body=None, token=None, query_string=None, **view_args):
+    """Invoke a view function directly inside a request context, bypassing WSGI dispatch"""
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    with flask_app.test_request_context(json=json_body, headers=headers, query_string=query_string):
+        return view_fn(**view_args)
+
+def _request_json(client, method, path, expect, **kwargs):
+    """Send a request, check its status code and return the decoded JSON body"""
+    response = getattr(client, method)(path, **kwargs)
+    assert response.status_code == expect
+    return response.json
+
+def get_json(client, path, headers=None, expect=200):
+    """GET a path and return its JSON body"""
+    return _request_json(client, 'get', path, expect, headers=headers)
+
+def post_json(client, path, json=None, headers=None, expect=201):
+    """POST to a path and return its JSON body"""
+    return _request_json(client, 'post', path, expect, json=json, headers=headers)
+
+def put_json(client, path, json=None, headers=None, expect=200):
+    """PUT to a path and return its JSON body"""
+    return _request_json(client, 'put', path, expect, json=json, headers=headers)
+
+def delete_json(client, path, headers=None, expect=200):
+    """DELETE a path and return its JSON body"""
+    return _request_json(client, 'delete', path, expect, headers=headers)
+
 def create_test_invoice_with_items(db_session, company, customer, product, num_items=3):
     """Helper to create invoice with multiple items"""
     invoice = Invoice(
@@ -138,9 +138,10 @@ class TestAuthRoutes:
         
         assert response.status_code == 401  # Invalid token
     
-    def test_logout_success(self, client, auth_headers):
+    def test_logout_success(self, client, fresh_auth_headers):
         """Test successful logout"""
-        response = client.post('/api/auth/logout', headers=auth_headers)
+        # Logout revokes the token, so use one that is not shared with other tests
+        response = client.post('/api/auth/logout', headers=fresh_auth_headers)
         
         assert response.status_code == 200
         data = response.get_json()
@@ -5,99 +5,108 @@ Tests for PDF and Excel generation utilities
 
 import pytest
 import os
-import tempfile
 from io import BytesIO
-from utils.pdf_generator import PDFGenerator
-from utils.excel_generator import ExcelGenerator
+from utils.pdf_generator import PDFGenerator, get_pdf_generator
+from utils.excel_generator import ExcelGenerator, get_excel_generator
+from utils.buffers import SpooledBuffer
+from utils.formatting import format_currency, format_date, format_percent, format_quantity
+from conftest import count_queries
 
 class TestPDFGenerator:
     """Test cases for PDF generator"""
     
-    def test_pdf_generator_init(self):
+    def test_pdf_generator_init(self, unique_tmp):
         """Test PDF generator initialization"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            assert generator.output_dir == temp_dir
-            assert os.path.exists(temp_dir)
+        generator = PDFGenerator(unique_tmp)
+        assert generator.output_dir == unique_tmp
+        assert os.path.exists(unique_tmp)
     
-    def test_pdf_generator_default_dir(self):
+    def test_pdf_generator_default_dir(self, unique_tmp, monkeypatch):
         """Test PDF generator with default directory"""
+        monkeypatch.chdir(unique_tmp)
         generator = PDFGenerator()
         assert generator.output_dir == 'generated_files'
         assert os.path.exists(generator.output_dir)
     
-    def test_generate_invoice_pdf_success(self, sample_invoice, sample_company, sample_customer, sample_invoice_item):
+    def test_get_pdf_generator_is_shared(self, unique_tmp):
+        """Test the factory reuses one generator per output directory"""
+        generator = get_pdf_generator(unique_tmp)
+        assert get_pdf_generator(unique_tmp) is generator
+        
+        # A removed output directory is recreated for the shared generator
+        os.rmdir(unique_tmp)
+        assert get_pdf_generator(unique_tmp) is generator
+        assert os.path.isdir(unique_tmp)
+    
+    def test_generate_invoice_pdf_success(self, sample_invoice, sample_company, sample_customer, sample_invoice_item, unique_tmp):
         """Test successful PDF generation for invoice"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            
-            # Ensure invoice has items and totals
-            sample_invoice.items.append(sample_invoice_item)
-            sample_invoice.calculate_totals()
-            
-            filepath = generator.generate_invoice_pdf(
-                invoice=sample_invoice,
-                company=sample_company,
-                customer=sample_customer
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert filepath.endswith('.pdf')
-            assert os.path.getsize(filepath) > 0
+        generator = PDFGenerator(unique_tmp)
+        
+        # Ensure invoice has items and totals
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepath = generator.generate_invoice_pdf(
+            invoice=sample_invoice,
+            company=sample_company,
+            customer=sample_customer
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith('.pdf')
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_invoice_pdf_without_company(self, sample_invoice, sample_customer, sample_invoice_item):
+    def test_generate_invoice_pdf_without_company(self, sample_invoice, sample_customer, sample_invoice_item, unique_tmp):
         """Test PDF generation without company info"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            
-            sample_invoice.items.append(sample_invoice_item)
-            sample_invoice.calculate_totals()
-            
-            filepath = generator.generate_invoice_pdf(
-                invoice=sample_invoice,
-                customer=sample_customer
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = PDFGenerator(unique_tmp)
+        
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepath = generator.generate_invoice_pdf(
+            invoice=sample_invoice,
+            customer=sample_customer
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_invoice_pdf_without_customer(self, sample_invoice, sample_company, sample_invoice_item):
+    def test_generate_invoice_pdf_without_customer(self, sample_invoice, sample_company, sample_invoice_item, unique_tmp):
         """Test PDF generation without customer info"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            
-            sample_invoice.items.append(sample_invoice_item)
-            sample_invoice.calculate_totals()
-            
-            filepath = generator.generate_invoice_pdf(
-                invoice=sample_invoice,
-                company=sample_company
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = PDFGenerator(unique_tmp)
+        
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepath = generator.generate_invoice_pdf(
+            invoice=sample_invoice,
+            company=sample_company
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_invoice_pdf_without_items(self, sample_invoice, sample_company, sample_customer):
+    def test_generate_invoice_pdf_without_items(self, sample_invoice, sample_company, sample_customer, unique_tmp):
         """Test PDF generation without invoice items"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            
-            filepath = generator.generate_invoice_pdf(
-                invoice=sample_invoice,
-                company=sample_company,
-                customer=sample_customer
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = PDFGenerator(unique_tmp)
+        
+        filepath = generator.generate_invoice_pdf(
+            invoice=sample_invoice,
+            company=sample_company,
+            customer=sample_customer
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_invoice_pdf_buffer(self, sample_invoice, sample_company, sample_customer, sample_invoice_item):
+    def test_generate_invoice_pdf_buffer(self, sample_invoice, sample_company, sample_customer, sample_invoice_item,
+                                         unique_tmp):
         """Test PDF generation as buffer"""
-        generator = PDFGenerator()
+        generator = PDFGenerator(unique_tmp)
         
         sample_invoice.items.append(sample_invoice_item)
         sample_invoice.calculate_totals()
@@ -112,70 +121,114 @@ class TestPDFGenerator:
         assert buffer.getvalue() is not None
         assert len(buffer.getvalue()) > 0
     
-    def test_generate_report_pdf_success(self):
+    def test_generate_invoice_pdf_eager_loaded_items(self, db_session, sample_invoice, sample_company,
+                                                     sample_customer, sample_invoice_item, unique_tmp):
+        """Test an invoice loaded with its items and their products renders without further queries"""
+        from sqlalchemy.orm import selectinload
+        from models import Invoice, InvoiceItem
+        
+        generator = PDFGenerator(unique_tmp)
+        db_session.refresh(sample_company)
+        db_session.refresh(sample_customer)
+        invoice = (db_session.query(Invoice)
+                   .options(selectinload(Invoice.items).joinedload(InvoiceItem.product))
+                   .populate_existing()
+                   .filter_by(id=sample_invoice.id)
+                   .one())
+        
+        with count_queries(db_session.connection()) as queries:
+            buffer = generator.generate_invoice_pdf_buffer(invoice, sample_company, sample_customer)
+        
+        assert queries == []
+        assert len(buffer.getvalue()) > 0
+    
+    def test_generate_invoices_pdf_batch(self, sample_invoice, sample_company, sample_invoice_item, unique_tmp):
+        """Test batch PDF generation in worker processes"""
+        generator = PDFGenerator(unique_tmp)
+        
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepaths = generator.generate_invoices_pdf_batch([sample_invoice], company=sample_company, max_workers=1)
+        
+        assert len(filepaths) == 1
+        assert os.path.exists(filepaths[0])
+        assert os.path.getsize(filepaths[0]) > 0
+    
+    def test_generate_invoices_pdf_batch_in_pool(self, sample_invoice, sample_company, sample_invoice_item, unique_tmp):
+        """Test batch PDF generation spread over a process pool"""
+        generator = PDFGenerator(unique_tmp)
+        
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepaths = generator.generate_invoices_pdf_batch([sample_invoice, sample_invoice], company=sample_company,
+                                                          max_workers=2)
+        
+        assert len(filepaths) == 2
+        assert all(os.path.getsize(filepath) > 0 for filepath in filepaths)
+    
+    def test_generate_report_pdf_success(self, unique_tmp):
         """Test successful report PDF generation"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            
-            title = "Test Report"
-            headers = ["Column 1", "Column 2", "Column 3"]
-            data = [
-                ["Row 1 Col 1", "Row 1 Col 2", "Row 1 Col 3"],
-                ["Row 2 Col 1", "Row 2 Col 2", "Row 2 Col 3"],
-                ["Row 3 Col 1", "Row 3 Col 2", "Row 3 Col 3"]
-            ]
-            
-            filepath = generator.generate_report_pdf(
-                title=title,
-                data=data,
-                headers=headers
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert filepath.endswith('.pdf')
-            assert os.path.getsize(filepath) > 0
+        generator = PDFGenerator(unique_tmp)
+        
+        title = "Test Report"
+        headers = ["Column 1", "Column 2", "Column 3"]
+        data = [
+            ["Row 1 Col 1", "Row 1 Col 2", "Row 1 Col 3"],
+            ["Row 2 Col 1", "Row 2 Col 2", "Row 2 Col 3"],
+            ["Row 3 Col 1", "Row 3 Col 2", "Row 3 Col 3"]
+        ]
+        
+        filepath = generator.generate_report_pdf(
+            title=title,
+            data=data,
+            headers=headers
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith('.pdf')
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_report_pdf_without_headers(self):
+    def test_generate_report_pdf_without_headers(self, unique_tmp):
         """Test report PDF generation without headers"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            
-            title = "Test Report Without Headers"
-            data = [
-                ["Row 1 Col 1", "Row 1 Col 2"],
-                ["Row 2 Col 1", "Row 2 Col 2"]
-            ]
-            
-            filepath = generator.generate_report_pdf(
-                title=title,
-                data=data
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = PDFGenerator(unique_tmp)
+        
+        title = "Test Report Without Headers"
+        data = [
+            ["Row 1 Col 1", "Row 1 Col 2"],
+            ["Row 2 Col 1", "Row 2 Col 2"]
+        ]
+        
+        filepath = generator.generate_report_pdf(
+            title=title,
+            data=data
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_report_pdf_empty_data(self):
+    def test_generate_report_pdf_empty_data(self, unique_tmp):
         """Test report PDF generation with empty data"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = PDFGenerator(temp_dir)
-            
-            title = "Empty Report"
-            data = []
-            
-            filepath = generator.generate_report_pdf(
-                title=title,
-                data=data
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = PDFGenerator(unique_tmp)
+        
+        title = "Empty Report"
+        data = []
+        
+        filepath = generator.generate_report_pdf(
+            title=title,
+            data=data
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_pdf_generator_error_handling(self):
+    def test_pdf_generator_error_handling(self, unique_tmp):
         """Test PDF generator error handling"""
-        generator = PDFGenerator()
+        generator = PDFGenerator(unique_tmp)
         
         # Test with invalid invoice (None)
         with pytest.raises(Exception):
@@ -190,155 +243,195 @@ class TestPDFGenerator:
 class TestExcelGenerator:
     """Test cases for Excel generator"""
     
-    def test_excel_generator_init(self):
+    def test_excel_generator_init(self, unique_tmp):
         """Test Excel generator initialization"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            assert generator.output_dir == temp_dir
-            assert os.path.exists(temp_dir)
+        generator = ExcelGenerator(unique_tmp)
+        assert generator.output_dir == unique_tmp
+        assert os.path.exists(unique_tmp)
     
-    def test_excel_generator_default_dir(self):
+    def test_excel_generator_default_dir(self, unique_tmp, monkeypatch):
         """Test Excel generator with default directory"""
+        monkeypatch.chdir(unique_tmp)
         generator = ExcelGenerator()
         assert generator.output_dir == 'generated_files'
         assert os.path.exists(generator.output_dir)
     
-    def test_generate_invoice_excel_success(self, sample_invoice, sample_company, sample_customer, sample_invoice_item):
+    def test_get_excel_generator_is_shared(self, unique_tmp):
+        """Test the factory reuses one generator per output directory"""
+        generator = get_excel_generator(unique_tmp)
+        assert get_excel_generator(unique_tmp) is generator
+        
+        # A removed output directory is recreated for the shared generator
+        os.rmdir(unique_tmp)
+        assert get_excel_generator(unique_tmp) is generator
+        assert os.path.isdir(unique_tmp)
+    
+    def test_generate_invoice_excel_success(self, sample_invoice, sample_company, sample_customer, sample_invoice_item, unique_tmp):
         """Test successful Excel generation for invoice"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            # Ensure invoice has items and totals
-            sample_invoice.items.append(sample_invoice_item)
-            sample_invoice.calculate_totals()
-            
-            filepath = generator.generate_invoice_excel(
-                invoice=sample_invoice,
-                company=sample_company,
-                customer=sample_customer
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert filepath.endswith('.xlsx')
-            assert os.path.getsize(filepath) > 0
+        generator = ExcelGenerator(unique_tmp)
+        
+        # Ensure invoice has items and totals
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepath = generator.generate_invoice_excel(
+            invoice=sample_invoice,
+            company=sample_company,
+            customer=sample_customer
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith('.xlsx')
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_invoice_excel_without_company(self, sample_invoice, sample_customer, sample_invoice_item):
+    def test_generate_invoice_excel_without_company(self, sample_invoice, sample_customer, sample_invoice_item, unique_tmp):
         """Test Excel generation without company info"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            sample_invoice.items.append(sample_invoice_item)
-            sample_invoice.calculate_totals()
-            
-            filepath = generator.generate_invoice_excel(
-                invoice=sample_invoice,
-                customer=sample_customer
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = ExcelGenerator(unique_tmp)
+        
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepath = generator.generate_invoice_excel(
+            invoice=sample_invoice,
+            customer=sample_customer
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_invoice_excel_custom_filename(self, sample_invoice, sample_company, sample_customer):
+    def test_generate_invoice_excel_custom_filename(self, sample_invoice, sample_company, sample_customer, unique_tmp):
         """Test Excel generation with custom filename"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            custom_filename = "custom_invoice.xlsx"
-            filepath = generator.generate_invoice_excel(
-                invoice=sample_invoice,
-                company=sample_company,
-                customer=sample_customer,
-                filename=custom_filename
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert filepath.endswith(custom_filename)
+        generator = ExcelGenerator(unique_tmp)
+        
+        custom_filename = "custom_invoice.xlsx"
+        filepath = generator.generate_invoice_excel(
+            invoice=sample_invoice,
+            company=sample_company,
+            customer=sample_customer,
+            filename=custom_filename
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith(custom_filename)
     
-    def test_generate_invoices_report_success(self, sample_invoice, sample_invoice_item):
+    def test_generate_invoices_report_success(self, sample_invoice, sample_invoice_item, unique_tmp):
         """Test successful invoices report generation"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            # Prepare invoice list
-            sample_invoice.items.append(sample_invoice_item)
-            sample_invoice.calculate_totals()
-            invoices = [sample_invoice]
-            
-            filepath = generator.generate_invoices_report(invoices)
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert filepath.endswith('.xlsx')
-            assert os.path.getsize(filepath) > 0
+        generator = ExcelGenerator(unique_tmp)
+        
+        # Prepare invoice list
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        invoices = [sample_invoice]
+        
+        filepath = generator.generate_invoices_report(invoices)
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith('.xlsx')
+        assert os.path.getsize(filepath) > 0
+    
+    def test_generate_invoices_report_from_iterator(self, sample_invoice, unique_tmp):
+        """Test invoices report generation reads a one-shot iterator once"""
+        from openpyxl import load_workbook
+        
+        generator = ExcelGenerator(unique_tmp)
+        
+        filepath = generator.generate_invoices_report(iter([sample_invoice]))
+        
+        workbook = load_workbook(filepath)
+        assert workbook["Invoices Report"].max_row == 5
+        assert dict(workbook["Summary"].iter_rows(values_only=True))['Total Invoices'] == 1
     
-    def test_generate_invoices_report_empty_list(self):
+    def test_generate_invoices_report_empty_list(self, unique_tmp):
         """Test invoices report generation with empty list"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            invoices = []
-            filepath = generator.generate_invoices_report(invoices)
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = ExcelGenerator(unique_tmp)
+        
+        invoices = []
+        filepath = generator.generate_invoices_report(invoices)
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_customers_report_success(self, sample_customer):
+    def test_generate_customers_report_success(self, sample_customer, unique_tmp):
         """Test successful customers report generation"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            customers = [sample_customer]
-            filepath = generator.generate_customers_report(customers)
-            
-            assert filepath is not None
+        generator = ExcelGenerator(unique_tmp)
+        
+        customers = [sample_customer]
+        filepath = generator.generate_customers_report(customers)
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith('.xlsx')
+        assert os.path.getsize(filepath) > 0
+    
+    def test_generate_customers_report_with_invoice_counts(self, db_session, sample_customer, unique_tmp):
+        """Test precomputed invoice counts are used instead of loading each customer's invoices"""
+        from openpyxl import load_workbook
+        
+        generator = ExcelGenerator(unique_tmp)
+        db_session.refresh(sample_customer)
+        db_session.expire(sample_customer, ['invoices'])
+        
+        with count_queries(db_session.connection()) as queries:
+            filepath = generator.generate_customers_report([sample_customer], invoice_counts={sample_customer.id: 7})
+        
+        assert queries == []
+        rows = list(load_workbook(filepath).active.iter_rows(values_only=True))
+        assert rows[1][-1] == 7
+    
+    def test_generate_all_reports(self, sample_invoice, sample_customer, sample_product, unique_tmp):
+        """Test the three reports are generated together from model instances"""
+        generator = ExcelGenerator(unique_tmp)
+        
+        paths = generator.generate_all_reports([sample_invoice], [sample_customer], [sample_product])
+        
+        assert set(paths) == {'invoices', 'customers', 'products'}
+        assert len(set(paths.values())) == 3
+        for filepath in paths.values():
             assert os.path.exists(filepath)
-            assert filepath.endswith('.xlsx')
             assert os.path.getsize(filepath) > 0
     
-    def test_generate_customers_report_empty_list(self):
+    def test_generate_customers_report_empty_list(self, unique_tmp):
         """Test customers report generation with empty list"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            customers = []
-            filepath = generator.generate_customers_report(customers)
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = ExcelGenerator(unique_tmp)
+        
+        customers = []
+        filepath = generator.generate_customers_report(customers)
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_products_report_success(self, sample_product):
+    def test_generate_products_report_success(self, sample_product, unique_tmp):
         """Test successful products report generation"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            products = [sample_product]
-            filepath = generator.generate_products_report(products)
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert filepath.endswith('.xlsx')
-            assert os.path.getsize(filepath) > 0
+        generator = ExcelGenerator(unique_tmp)
+        
+        products = [sample_product]
+        filepath = generator.generate_products_report(products)
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith('.xlsx')
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_products_report_empty_list(self):
+    def test_generate_products_report_empty_list(self, unique_tmp):
         """Test products report generation with empty list"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            products = []
-            filepath = generator.generate_products_report(products)
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
+        generator = ExcelGenerator(unique_tmp)
+        
+        products = []
+        filepath = generator.generate_products_report(products)
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
     
-    def test_generate_excel_buffer_success(self):
+    def test_generate_excel_buffer_success(self, unique_tmp):
         """Test Excel generation as buffer"""
-        generator = ExcelGenerator()
+        generator = ExcelGenerator(unique_tmp)
         
         headers = ["Column 1", "Column 2", "Column 3"]
         data = [
@@ -356,9 +449,78 @@ class TestExcelGenerator:
         assert buffer.getvalue() is not None
         assert len(buffer.getvalue()) > 0
     
-    def test_generate_excel_buffer_empty_data(self):
+    def test_generate_excel_buffer_dict_rows(self, unique_tmp):
+        """Test dict rows are written by header, with missing keys left empty"""
+        from openpyxl import load_workbook
+        
+        generator = ExcelGenerator(unique_tmp)
+        
+        buffer = generator.generate_excel_buffer(
+            data=[{'A': 1, 'B': 2}, {'B': 4, 'C': 'ignored'}],
+            headers=['A', 'B']
+        )
+        
+        rows = list(load_workbook(buffer).active.iter_rows(values_only=True))
+        assert rows == [('A', 'B'), (1, 2), (None, 4)]
+    
+    def test_generate_excel_buffer_spooled(self, unique_tmp):
+        """Test Excel buffer generation into a disk-spilling buffer"""
+        generator = ExcelGenerator(unique_tmp)
+        
+        buffer = generator.generate_excel_buffer(
+            data=[["Row 1", 1], ["Row 2", 2]],
+            headers=["Name", "Value"],
+            use_spooled=True
+        )
+        
+        assert isinstance(buffer, SpooledBuffer)
+        assert buffer.tell() == 0
+        assert buffer.getvalue()[:2] == b'PK'  # xlsx files are zip archives
+    
+    def test_generate_excel_buffer_fast_compress(self, unique_tmp):
+        """Test Excel buffer generation with fast zip compression"""
+        from openpyxl import load_workbook
+        
+        generator = ExcelGenerator(unique_tmp, fast_compress=True)
+        
+        buffer = generator.generate_excel_buffer(
+            data=[["Row 1", 1], ["Row 2", 2]],
+            headers=["Name", "Value"]
+        )
+        
+        rows = list(load_workbook(buffer).active.iter_rows(values_only=True))
+        assert rows == [("Name", "Value"), ("Row 1", 1), ("Row 2", 2)]
+    
+    def test_generate_excel_buffer_fast_compress_without_writer(self, monkeypatch, unique_tmp):
+        """Test fast compression falls back to a regular save when openpyxl's writer is unavailable"""
+        from openpyxl import load_workbook
+        import utils.excel_generator
+        
+        monkeypatch.setattr(utils.excel_generator, 'ExcelWriter', None)
+        generator = ExcelGenerator(unique_tmp, fast_compress=True)
+        
+        buffer = generator.generate_excel_buffer(data=[["Row 1", 1]], headers=["Name", "Value"])
+        
+        rows = list(load_workbook(buffer).active.iter_rows(values_only=True))
+        assert rows == [("Name", "Value"), ("Row 1", 1)]
+    
+    def test_stream_excel(self, unique_tmp):
+        """Test Excel generation streamed as chunks of a temporary file"""
+        from openpyxl import load_workbook
+        
+        generator = ExcelGenerator(unique_tmp)
+        data = [[f"Row {i}", i] for i in range(2000)]
+        
+        chunks = list(generator.stream_excel(data=data, headers=["Name", "Value"], chunk_size=4096))
+        
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 4096 for chunk in chunks)
+        sheet = load_workbook(BytesIO(b''.join(chunks))).active
+        assert sheet.max_row == 2001
+    
+    def test_generate_excel_buffer_empty_data(self, unique_tmp):
         """Test Excel buffer generation with empty data"""
-        generator = ExcelGenerator()
+        generator = ExcelGenerator(unique_tmp)
         
         headers = ["Column 1", "Column 2"]
         data = []
@@ -372,9 +534,9 @@ class TestExcelGenerator:
         assert buffer.getvalue() is not None
         assert len(buffer.getvalue()) > 0
     
-    def test_excel_generator_error_handling(self):
+    def test_excel_generator_error_handling(self, unique_tmp):
         """Test Excel generator error handling"""
-        generator = ExcelGenerator()
+        generator = ExcelGenerator(unique_tmp)
         
         # Test with invalid invoice (None)
         with pytest.raises(Exception):
@@ -384,86 +546,82 @@ class TestExcelGenerator:
         with pytest.raises(Exception):
             generator.generate_excel_buffer(None, None)
     
-    def test_excel_generator_custom_filename(self, sample_invoice):
+    def test_excel_generator_custom_filename(self, sample_invoice, unique_tmp):
         """Test Excel generation with custom filename"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            custom_filename = "test_custom_invoice.xlsx"
-            filepath = generator.generate_invoice_excel(
-                invoice=sample_invoice,
-                filename=custom_filename
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert filepath.endswith(custom_filename)
+        generator = ExcelGenerator(unique_tmp)
+        
+        custom_filename = "test_custom_invoice.xlsx"
+        filepath = generator.generate_invoice_excel(
+            invoice=sample_invoice,
+            filename=custom_filename
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert filepath.endswith(custom_filename)
     
-    def test_excel_reports_with_multiple_sheets(self, sample_product):
+    def test_excel_reports_with_multiple_sheets(self, sample_product, unique_tmp):
         """Test Excel reports with multiple sheets"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            # Create products with different categories
-            products = [sample_product]
-            
-            filepath = generator.generate_products_report(products)
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
-            
-            # The file should contain both main sheet and categories sheet
-            # We can't easily verify sheet contents without opening the file,
-            # but we can verify the file was created successfully
+        generator = ExcelGenerator(unique_tmp)
+        
+        # Create products with different categories
+        products = [sample_product]
+        
+        filepath = generator.generate_products_report(products)
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
+        
+        # The file should contain both main sheet and categories sheet
+        # We can't easily verify sheet contents without opening the file,
+        # but we can verify the file was created successfully
     
-    def test_excel_formatting_and_styling(self, sample_invoice, sample_company, sample_customer, sample_invoice_item):
+    def test_excel_formatting_and_styling(self, sample_invoice, sample_company, sample_customer, sample_invoice_item, unique_tmp):
         """Test Excel formatting and styling"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            # Create invoice with multiple items for better formatting test
-            sample_invoice.items.append(sample_invoice_item)
-            sample_invoice.calculate_totals()
-            
-            filepath = generator.generate_invoice_excel(
-                invoice=sample_invoice,
-                company=sample_company,
-                customer=sample_customer
-            )
-            
-            assert filepath is not None
-            assert os.path.exists(filepath)
-            assert os.path.getsize(filepath) > 0
-            
-            # File should be properly formatted with headers, borders, etc.
-            # The exact formatting is handled by openpyxl and our styling code
+        generator = ExcelGenerator(unique_tmp)
+        
+        # Create invoice with multiple items for better formatting test
+        sample_invoice.items.append(sample_invoice_item)
+        sample_invoice.calculate_totals()
+        
+        filepath = generator.generate_invoice_excel(
+            invoice=sample_invoice,
+            company=sample_company,
+            customer=sample_customer
+        )
+        
+        assert filepath is not None
+        assert os.path.exists(filepath)
+        assert os.path.getsize(filepath) > 0
+        
+        # File should be properly formatted with headers, borders, etc.
+        # The exact formatting is handled by openpyxl and our styling code
     
-    def test_large_data_handling(self):
+    def test_large_data_handling(self, unique_tmp):
         """Test handling of large datasets"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            generator = ExcelGenerator(temp_dir)
-            
-            # Generate large dataset
-            headers = ["ID", "Name", "Value", "Description"]
-            data = []
-            for i in range(1000):  # 1000 rows
-                data.append([i, f"Name {i}", f"Value {i}", f"Description {i}"])
-            
-            buffer = generator.generate_excel_buffer(
-                data=data,
-                headers=headers
-            )
-            
-            assert isinstance(buffer, BytesIO)
-            assert len(buffer.getvalue()) > 0
-            
-            # Large file should still be created successfully
-            assert len(buffer.getvalue()) > 10000  # Should be reasonably large
-    
-    def test_special_characters_handling(self):
+        generator = ExcelGenerator(unique_tmp)
+        
+        # Generate large dataset
+        headers = ["ID", "Name", "Value", "Description"]
+        data = []
+        for i in range(1000):  # 1000 rows
+            data.append([i, f"Name {i}", f"Value {i}", f"Description {i}"])
+        
+        buffer = generator.generate_excel_buffer(
+            data=data,
+            headers=headers
+        )
+        
+        assert isinstance(buffer, BytesIO)
+        assert len(buffer.getvalue()) > 0
+        
+        # Large file should still be created successfully
+        assert len(buffer.getvalue()) > 10000  # Should be reasonably large
+    
+    def test_special_characters_handling(self, unique_tmp):
         """Test handling of special characters in data"""
-        generator = ExcelGenerator()
+        generator = ExcelGenerator(unique_tmp)
         
         headers = ["Name", "Description", "Special"]
         data = [
@@ -480,4 +638,34 @@ class TestExcelGenerator:
         assert isinstance(buffer, BytesIO)
         assert len(buffer.getvalue()) > 0
         
-        # Special characters should be handled properly
\ No newline at end of file
+        # Special characters should be handled properly
+
+
+class TestFormatting:
+    """Test cases for the shared formatting helpers"""
+    
+    def test_format_date(self):
+        """Test dates and datetimes format as DD-MM-YYYY"""
+        from datetime import date, datetime
+        
+        assert format_date(date(2024, 3, 5)) == '05-03-2024'
+        assert format_date(datetime(2024, 3, 5, 23, 59)) == '05-03-2024'
+        assert format_date(None) == ''
+    
+    def test_format_currency(self):
+        """Test amounts format as rupees with two decimals"""
+        from decimal import Decimal
+        
+        assert format_currency(Decimal('1234.5')) == '₹1234.50'
+        assert format_currency(99) == '₹99.00'
+        assert format_currency(None) == '₹0.00'
+        assert format_currency(0) == '₹0.00'
+    
+    def test_format_quantity_and_percent(self):
+        """Test quantities format with two decimals and percentages with one"""
+        from decimal import Decimal
+        
+        assert format_quantity(Decimal('2.5')) == '2.50'
+        assert format_quantity(None) == '0.00'
+        assert format_percent(Decimal('12.25')) == '12.2%'
+        assert format_percent(0) == '0.0%'
@@ -3,10 +3,31 @@ Utils Package
 Contains utility functions for PDF generation, Excel export, and other common operations
 """
 
-from .pdf_generator import PDFGenerator
-from .excel_generator import ExcelGenerator
+import importlib
+
+# Generators are imported on first access so a caller only pays for ReportLab or openpyxl when it uses them
+_LAZY_EXPORTS = {
+    'PDFGenerator': '.pdf_generator',
+    'ExcelGenerator': '.excel_generator',
+    'get_pdf_generator': '.pdf_generator',
+    'get_excel_generator': '.excel_generator'
+}
 
 __all__ = [
     'PDFGenerator',
-    'ExcelGenerator'
-]
\ No newline at end of file
+    'ExcelGenerator',
+    'get_pdf_generator',
+    'get_excel_generator'
+]
+
+def __getattr__(name):
+    """Import a generator the first time it is accessed"""
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    """List the lazy exports alongside the module's own names"""
+    return sorted(set(globals()) | set(__all__))
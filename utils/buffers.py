@@ -0,0 +1,24 @@
+"""
+Output Buffers
+In-memory file buffers that spill to disk once a generated file grows large
+"""
+
+from tempfile import SpooledTemporaryFile
+
+# Generated files larger than this are moved from memory to a temporary file
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+class SpooledBuffer(SpooledTemporaryFile):
+    """SpooledTemporaryFile with the getvalue() of BytesIO"""
+    
+    def __init__(self, max_size=SPOOL_MAX_SIZE):
+        super().__init__(max_size=max_size)
+    
+    def getvalue(self):
+        """Return the whole contents without moving the current position"""
+        position = self.tell()
+        self.seek(0)
+        try:
+            return self.read()
+        finally:
+            self.seek(position)
@@ -3,515 +3,617 @@ Excel Generator
 Handles Excel file generation for reports and data exports
 """
 
+import logging
 import os
-from datetime import datetime
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
 from io import BytesIO
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
+from itertools import chain, islice
+from operator import attrgetter
+from tempfile import TemporaryFile
+from zipfile import ZipFile, ZIP_DEFLATED
+from openpyxl import LXML, Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
 from openpyxl.chart import BarChart, Reference, LineChart, PieChart
+try:
+    # Not part of openpyxl's documented API; without it fast_compress falls back to Workbook.save
+    from openpyxl.writer.excel import ExcelWriter
+except ImportError:
+    ExcelWriter = None
+from .buffers import SpooledBuffer
+from .formatting import company_header_lines, format_date
+from .snapshots import snapshot
+
+logger = logging.getLogger(__name__)
+
+# Block size used when streaming a generated file back to the caller
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Rows buffered to size columns before a streamed report starts writing; later rows are not measured
+WIDTH_SAMPLE_ROWS = 1000
+
+# Column headers of the tabular reports, and the functions that flatten one record into a row
+INVOICE_REPORT_HEADERS = ('Invoice Number', 'Invoice Date', 'Customer', 'PO Number', 'PO Date', 'Subtotal',
+                          'GST Amount', 'Total Amount', 'Status', 'Payment Mode', 'Created Date')
+INVOICE_TOTAL_COLUMN = INVOICE_REPORT_HEADERS.index('Total Amount')
+INVOICE_STATUS_COLUMN = INVOICE_REPORT_HEADERS.index('Status')
+CUSTOMER_REPORT_HEADERS = ('Customer Name', 'Address', 'City', 'State', 'PIN Code', 'GSTIN',
+                           'Contact Person', 'Phone', 'Email', 'Created Date', 'Invoice Count')
+PRODUCT_REPORT_HEADERS = ('Category', 'Product Name', 'Description', 'Unit', 'Rate', 'HSN Code',
+                          'Created Date', 'Usage Count')
+PRODUCT_CATEGORY_COLUMN = PRODUCT_REPORT_HEADERS.index('Category')
+PRODUCT_RATE_COLUMN = PRODUCT_REPORT_HEADERS.index('Rate')
+
+# Dates are written as real date cells so Excel can sort and filter them; this is how they display
+REPORT_DATE_FORMAT = 'DD-MM-YYYY'
+INVOICE_DATE_COLUMNS = tuple(INVOICE_REPORT_HEADERS.index(h) for h in ('Invoice Date', 'PO Date', 'Created Date'))
+CUSTOMER_DATE_COLUMNS = (CUSTOMER_REPORT_HEADERS.index('Created Date'),)
+PRODUCT_DATE_COLUMNS = (PRODUCT_REPORT_HEADERS.index('Created Date'),)
+
+def _invoice_report_row(invoice):
+    """Flatten an invoice into an invoices report row"""
+    return (
+        invoice.invoice_number,
+        invoice.invoice_date or '',
+        invoice.customer.name if invoice.customer else '',
+        invoice.po_number or '',
+        invoice.po_date or '',
+        float(invoice.subtotal) if invoice.subtotal else 0,
+        float(invoice.gst_amount) if invoice.gst_amount else 0,
+        float(invoice.total_amount) if invoice.total_amount else 0,
+        invoice.status,
+        invoice.payment_mode or '',
+        invoice.created_at or ''
+    )
+
+def _customer_report_row(customer, invoice_count):
+    """Flatten a customer into a customers report row"""
+    return (
+        customer.name,
+        customer.address or '',
+        customer.city or '',
+        customer.state or '',
+        customer.pincode or '',
+        customer.gstin or '',
+        customer.contact_person or '',
+        customer.phone or '',
+        customer.email or '',
+        customer.created_at or '',
+        invoice_count
+    )
+
+def _product_report_row(product, usage_count):
+    """Flatten a product into a products report row"""
+    return (
+        product.category or '',
+        product.name,
+        product.description or '',
+        product.unit,
+        float(product.rate) if product.rate else 0,
+        product.hsn_code or '',
+        product.created_at or '',
+        usage_count
+    )
+
+def _data_row(row, headers):
+    """Flatten a data export row; mappings are read by header, missing keys left empty"""
+    if isinstance(row, Mapping):
+        return tuple(row.get(header) for header in headers)
+    return tuple(row)
+
+def _item_hsn_code(item):
+    """HSN code of an invoice item's product, or '' when there is none"""
+    product = item.product
+    return product.hsn_code or '' if product else ''
+
+def _invoice_item_row(index, item):
+    """Flatten an invoice item into a row of the invoice sheet's items table"""
+    return (
+        index,
+        item.description or '',
+        _item_hsn_code(item),
+        float(item.quantity) if item.quantity else 0,
+        item.unit or '',
+        float(item.rate) if item.rate else 0,
+        float(item.discount_percent) if item.discount_percent else 0,
+        float(item.amount) if item.amount else 0
+    )
+
+# Label/value rows of the invoice sheet as (label, value getter, shown even when the value is empty)
+INVOICE_DETAIL_FIELDS = (
+    ('Invoice Number:', attrgetter('invoice_number'), True),
+    ('Invoice Date:', lambda invoice: format_date(invoice.invoice_date), True),
+    ('PO Number:', attrgetter('po_number'), False),
+    ('PO Date:', lambda invoice: format_date(invoice.po_date), False),
+    ('Payment Mode:', attrgetter('payment_mode'), False)
+)
+CUSTOMER_DETAIL_FIELDS = (
+    ('Customer:', attrgetter('name'), True),
+    ('Address:', attrgetter('address'), False),
+    ('City, State:', lambda customer: f"{customer.city}, {customer.state}" if customer.city and customer.state else '', False),
+    ('PIN Code:', attrgetter('pincode'), False),
+    ('GSTIN:', attrgetter('gstin'), False),
+    ('Contact Person:', attrgetter('contact_person'), False),
+    ('Phone:', attrgetter('phone'), False)
+)
+BANKING_DETAIL_FIELDS = (
+    ('Bank Name:', attrgetter('bank_name'), True),
+    ('Account Number:', attrgetter('account_number'), False),
+    ('IFSC Code:', attrgetter('ifsc_code'), False)
+)
 
 class ExcelGenerator:
     """Excel generation utility class"""
     
-    def __init__(self, output_dir='generated_files'):
+    # Shared style objects; openpyxl styles are immutable, so one instance serves every cell
+    TITLE_FONT = Font(bold=True, size=16)
+    HEADER_FONT = Font(bold=True, size=14)
+    TABLE_HEADER_FONT = Font(bold=True, size=12)
+    BOLD_FONT = Font(bold=True)
+    # Fill colours are full ARGB; six-digit values get a 00 (fully transparent) alpha from openpyxl
+    HEADER_FILL = PatternFill(start_color='FFCCCCCC', end_color='FFCCCCCC', fill_type='solid')
+    TOTALS_FILL = PatternFill(start_color='FFFFFFCC', end_color='FFFFFFCC', fill_type='solid')
+    THIN_SIDE = Side(style='thin')
+    THIN_BORDER = Border(left=THIN_SIDE, right=THIN_SIDE, top=THIN_SIDE, bottom=THIN_SIDE)
+    RIGHT_ALIGN = Alignment(horizontal='right')
+    
+    # Named styles for the single invoice sheet, so each cell is styled with a single assignment
+    TITLE_STYLE = 'invoice_title'
+    HEADING_STYLE = 'invoice_heading'
+    TABLE_HEADER_STYLE = 'invoice_table_header'
+    ITEM_TEXT_STYLE = 'invoice_item_text'
+    ITEM_NUMBER_STYLE = 'invoice_item_number'
+    TOTALS_LABEL_STYLE = 'invoice_totals_label'
+    TOTALS_VALUE_STYLE = 'invoice_totals_value'
+    
+    def __init__(self, output_dir='generated_files', fast_compress=False):
         self.output_dir = output_dir
+        self.fast_compress = fast_compress
         self.ensure_output_dir()
         
     def ensure_output_dir(self):
         """Ensure output directory exists"""
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
     
     def generate_invoice_excel(self, invoice, company=None, customer=None, filename=None):
-        """Generate Excel file for a single invoice"""
-        try:
-            if not filename:
-                filename = f"invoice_{invoice.invoice_number.replace('/', '_')}.xlsx"
-            
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Create workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Invoice"
-            
-            # Styling
-            header_font = Font(bold=True, size=14)
-            title_font = Font(bold=True, size=16)
-            table_header_font = Font(bold=True, size=12)
-            border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                          top=Side(style='thin'), bottom=Side(style='thin'))
-            
-            # Company header
-            row = 1
-            if company:
-                ws.cell(row=row, column=1, value=company.name).font = title_font
-                row += 1
-                
-                if company.address:
-                    ws.cell(row=row, column=1, value=company.address)
-                    row += 1
-                
-                if company.city and company.state:
-                    ws.cell(row=row, column=1, value=f"{company.city}, {company.state}")
-                    row += 1
-                
-                if company.pincode:
-                    ws.cell(row=row, column=1, value=f"PIN: {company.pincode}")
-                    row += 1
-                
-                if company.gstin:
-                    ws.cell(row=row, column=1, value=f"GSTIN: {company.gstin}")
-                    row += 1
-                
-                if company.contact_phone:
-                    ws.cell(row=row, column=1, value=f"Phone: {company.contact_phone}")
-                    row += 1
-                
-                if company.email:
-                    ws.cell(row=row, column=1, value=f"Email: {company.email}")
-                    row += 1
-                
-                row += 1
-            
-            # Invoice title
-            ws.cell(row=row, column=1, value="TAX INVOICE").font = header_font
-            row += 2
-            
-            # Invoice details
-            ws.cell(row=row, column=1, value="Invoice Number:").font = header_font
-            ws.cell(row=row, column=2, value=invoice.invoice_number)
-            row += 1
-            
-            ws.cell(row=row, column=1, value="Invoice Date:").font = header_font
-            ws.cell(row=row, column=2, value=invoice.invoice_date.strftime('%d-%m-%Y') if invoice.invoice_date else '')
-            row += 1
-            
-            if invoice.po_number:
-                ws.cell(row=row, column=1, value="PO Number:").font = header_font
-                ws.cell(row=row, column=2, value=invoice.po_number)
-                row += 1
-            
-            if invoice.po_date:
-                ws.cell(row=row, column=1, value="PO Date:").font = header_font
-                ws.cell(row=row, column=2, value=invoice.po_date.strftime('%d-%m-%Y'))
-                row += 1
-            
-            if invoice.payment_mode:
-                ws.cell(row=row, column=1, value="Payment Mode:").font = header_font
-                ws.cell(row=row, column=2, value=invoice.payment_mode)
-                row += 1
-            
-            row += 1
-            
-            # Customer details
-            if customer:
-                ws.cell(row=row, column=1, value="Bill To:").font = header_font
-                row += 1
-                
-                ws.cell(row=row, column=1, value="Customer:").font = header_font
-                ws.cell(row=row, column=2, value=customer.name)
-                row += 1
-                
-                if customer.address:
-                    ws.cell(row=row, column=1, value="Address:").font = header_font
-                    ws.cell(row=row, column=2, value=customer.address)
-                    row += 1
-                
-                if customer.city and customer.state:
-                    ws.cell(row=row, column=1, value="City, State:").font = header_font
-                    ws.cell(row=row, column=2, value=f"{customer.city}, {customer.state}")
-                    row += 1
-                
-                if customer.pincode:
-                    ws.cell(row=row, column=1, value="PIN Code:").font = header_font
-                    ws.cell(row=row, column=2, value=customer.pincode)
-                    row += 1
-                
-                if customer.gstin:
-                    ws.cell(row=row, column=1, value="GSTIN:").font = header_font
-                    ws.cell(row=row, column=2, value=customer.gstin)
-                    row += 1
-                
-                if customer.contact_person:
-                    ws.cell(row=row, column=1, value="Contact Person:").font = header_font
-                    ws.cell(row=row, column=2, value=customer.contact_person)
-                    row += 1
-                
-                if customer.phone:
-                    ws.cell(row=row, column=1, value="Phone:").font = header_font
-                    ws.cell(row=row, column=2, value=customer.phone)
-                    row += 1
-                
-                row += 1
-            
-            # Items table
-            if invoice.items:
-                # Headers
-                headers = ['S.No.', 'Description', 'HSN Code', 'Quantity', 'Unit', 'Rate', 'Discount %', 'Amount']
-                for col, header in enumerate(headers, 1):
-                    cell = ws.cell(row=row, column=col, value=header)
-                    cell.font = table_header_font
-                    cell.border = border
-                    cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-                
-                row += 1
-                
-                # Items
-                for i, item in enumerate(invoice.items, 1):
-                    hsn_code = item.product.hsn_code if item.product and item.product.hsn_code else ''
-                    
-                    data = [
-                        i,
-                        item.description or '',
-                        hsn_code,
-                        float(item.quantity) if item.quantity else 0,
-                        item.unit or '',
-                        float(item.rate) if item.rate else 0,
-                        float(item.discount_percent) if item.discount_percent else 0,
-                        float(item.amount) if item.amount else 0
-                    ]
-                    
-                    for col, value in enumerate(data, 1):
-                        cell = ws.cell(row=row, column=col, value=value)
-                        cell.border = border
-                        if col >= 4:  # Numeric columns
-                            cell.alignment = Alignment(horizontal='right')
-                    
-                    row += 1
-                
-                # Totals
-                totals_row = row
-                ws.cell(row=totals_row, column=7, value="Subtotal:").font = table_header_font
-                ws.cell(row=totals_row, column=8, value=float(invoice.subtotal) if invoice.subtotal else 0)
-                
-                row += 1
-                ws.cell(row=row, column=7, value="GST (18%):").font = table_header_font
-                ws.cell(row=row, column=8, value=float(invoice.gst_amount) if invoice.gst_amount else 0)
-                
-                row += 1
-                ws.cell(row=row, column=7, value="Total:").font = table_header_font
-                ws.cell(row=row, column=8, value=float(invoice.total_amount) if invoice.total_amount else 0)
-                
-                # Style totals
-                for r in range(totals_row, row + 1):
-                    for c in range(7, 9):
-                        cell = ws.cell(row=r, column=c)
-                        cell.border = border
-                        cell.fill = PatternFill(start_color='FFFFCC', end_color='FFFFCC', fill_type='solid')
-                        if c == 8:
-                            cell.alignment = Alignment(horizontal='right')
-                
-                row += 2
-            
-            # Banking details
-            if company and company.bank_name:
-                ws.cell(row=row, column=1, value="Banking Details:").font = header_font
-                row += 1
-                
-                ws.cell(row=row, column=1, value="Bank Name:")
-                ws.cell(row=row, column=2, value=company.bank_name)
-                row += 1
-                
-                if company.account_number:
-                    ws.cell(row=row, column=1, value="Account Number:")
-                    ws.cell(row=row, column=2, value=company.account_number)
-                    row += 1
-                
-                if company.ifsc_code:
-                    ws.cell(row=row, column=1, value="IFSC Code:")
-                    ws.cell(row=row, column=2, value=company.ifsc_code)
-                    row += 1
-            
-            # Adjust column widths
-            ws.column_dimensions['A'].width = 20
-            ws.column_dimensions['B'].width = 30
-            ws.column_dimensions['C'].width = 15
-            ws.column_dimensions['D'].width = 12
-            ws.column_dimensions['E'].width = 10
-            ws.column_dimensions['F'].width = 12
-            ws.column_dimensions['G'].width = 12
-            ws.column_dimensions['H'].width = 15
-            
-            # Save workbook
-            wb.save(filepath)
-            
-            return filepath
-            
-        except Exception as e:
-            raise Exception(f"Error generating Excel file: {str(e)}")
-    
-    def generate_invoices_report(self, invoices, filename=None):
-        """Generate Excel report for multiple invoices"""
-        try:
-            if not filename:
-                filename = f"invoices_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Prepare data
-            data = []
-            for invoice in invoices:
-                data.append({
-                    'Invoice Number': invoice.invoice_number,
-                    'Invoice Date': invoice.invoice_date.strftime('%d-%m-%Y') if invoice.invoice_date else '',
-                    'Customer': invoice.customer.name if invoice.customer else '',
-                    'PO Number': invoice.po_number or '',
-                    'PO Date': invoice.po_date.strftime('%d-%m-%Y') if invoice.po_date else '',
-                    'Subtotal': float(invoice.subtotal) if invoice.subtotal else 0,
-                    'GST Amount': float(invoice.gst_amount) if invoice.gst_amount else 0,
-                    'Total Amount': float(invoice.total_amount) if invoice.total_amount else 0,
-                    'Status': invoice.status,
-                    'Payment Mode': invoice.payment_mode or '',
-                    'Created Date': invoice.created_at.strftime('%d-%m-%Y') if invoice.created_at else ''
-                })
-            
-            # Create DataFrame
-            df = pd.DataFrame(data)
-            
-            # Create workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Invoices Report"
-            
-            # Add title
-            ws.cell(row=1, column=1, value="INVOICES REPORT").font = Font(bold=True, size=16)
-            ws.cell(row=2, column=1, value=f"Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}")
-            
-            # Add data
-            for r in dataframe_to_rows(df, index=False, header=True):
-                ws.append(r)
-            
-            # Style header
-            header_row = 4
-            for col in range(1, len(df.columns) + 1):
-                cell = ws.cell(row=header_row, column=col)
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-                cell.border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                                   top=Side(style='thin'), bottom=Side(style='thin'))
-            
-            # Auto-adjust column widths
-            for column in ws.columns:
-                length = max(len(str(cell.value)) for cell in column)
-                ws.column_dimensions[column[0].column_letter].width = min(length + 2, 50)
-            
-            # Add summary sheet
-            ws_summary = wb.create_sheet("Summary")
-            
-            # Summary calculations
-            total_invoices = len(invoices)
-            total_amount = sum(float(inv.total_amount) if inv.total_amount else 0 for inv in invoices)
-            draft_count = sum(1 for inv in invoices if inv.status == 'DRAFT')
-            sent_count = sum(1 for inv in invoices if inv.status == 'SENT')
-            paid_count = sum(1 for inv in invoices if inv.status == 'PAID')
-            cancelled_count = sum(1 for inv in invoices if inv.status == 'CANCELLED')
-            
-            # Add summary data
-            summary_data = [
-                ['Invoice Summary', ''],
-                ['Total Invoices', total_invoices],
-                ['Total Amount', total_amount],
-                ['', ''],
-                ['Status Breakdown', ''],
-                ['Draft', draft_count],
-                ['Sent', sent_count],
-                ['Paid', paid_count],
-                ['Cancelled', cancelled_count]
+        """Generate Excel file for a single invoice; load items with selectinload(Invoice.items).joinedload(InvoiceItem.product) to avoid a query per item"""
+        if not filename:
+            filename = f"invoice_{invoice.invoice_number.replace('/', '_')}.xlsx"
+        
+        filepath = os.path.join(self.output_dir, filename)
+        
+        # Create workbook
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Invoice"
+        self._add_invoice_styles(wb)
+        
+        # Rows are collected first and written with ws.append; styled cells carry a named style
+        def heading(text):
+            return self._named_cell(ws, text, self.HEADING_STYLE)
+        
+        rows = []
+        
+        # Company header
+        if company:
+            rows.append([self._named_cell(ws, company.name, self.TITLE_STYLE)])
+            rows.extend([line] for line in company_header_lines(company))
+            rows.append([])
+        
+        # Invoice title
+        rows.append([heading("TAX INVOICE")])
+        rows.append([])
+        
+        # Invoice details
+        rows.extend(self._detail_rows(ws, invoice, INVOICE_DETAIL_FIELDS, self.HEADING_STYLE))
+        rows.append([])
+        
+        # Customer details
+        if customer:
+            rows.append([heading("Bill To:")])
+            rows.extend(self._detail_rows(ws, customer, CUSTOMER_DETAIL_FIELDS, self.HEADING_STYLE))
+            rows.append([])
+        
+        # Items table
+        if invoice.items:
+            # Headers
+            headers = ['S.No.', 'Description', 'HSN Code', 'Quantity', 'Unit', 'Rate', 'Discount %', 'Amount']
+            rows.append([self._named_cell(ws, header, self.TABLE_HEADER_STYLE) for header in headers])
+            
+            # Items; numeric columns from the fourth onwards are right aligned
+            named_cell = self._named_cell
+            column_styles = (self.ITEM_TEXT_STYLE,) * 3 + (self.ITEM_NUMBER_STYLE,) * (len(headers) - 3)
+            for i, item in enumerate(invoice.items, 1):
+                rows.append([named_cell(ws, value, style)
+                             for value, style in zip(_invoice_item_row(i, item), column_styles)])
+            
+            # Totals
+            totals = [
+                ("Subtotal:", invoice.subtotal),
+                ("GST (18%):", invoice.gst_amount),
+                ("Total:", invoice.total_amount)
             ]
             
-            for row_num, (label, value) in enumerate(summary_data, 1):
-                ws_summary.cell(row=row_num, column=1, value=label).font = Font(bold=True)
-                ws_summary.cell(row=row_num, column=2, value=value)
-            
-            # Save workbook
-            wb.save(filepath)
-            
-            return filepath
+            for label, amount in totals:
+                rows.append([None] * 6 + [
+                    self._named_cell(ws, label, self.TOTALS_LABEL_STYLE),
+                    self._named_cell(ws, float(amount) if amount else 0, self.TOTALS_VALUE_STYLE)
+                ])
             
-        except Exception as e:
-            raise Exception(f"Error generating invoices report: {str(e)}")
+            rows.append([])
+        
+        # Banking details
+        if company and company.bank_name:
+            rows.append([heading("Banking Details:")])
+            rows.extend(self._detail_rows(ws, company, BANKING_DETAIL_FIELDS))
+        
+        for row in rows:
+            ws.append(row)
+        
+        # Adjust column widths
+        ws.column_dimensions['A'].width = 20
+        ws.column_dimensions['B'].width = 30
+        ws.column_dimensions['C'].width = 15
+        ws.column_dimensions['D'].width = 12
+        ws.column_dimensions['E'].width = 10
+        ws.column_dimensions['F'].width = 12
+        ws.column_dimensions['G'].width = 12
+        ws.column_dimensions['H'].width = 15
+        
+        # Save workbook
+        self._save_workbook(wb, filepath)
+        
+        return filepath
+    
+    def _add_invoice_styles(self, wb):
+        """Register the invoice sheet named styles on a workbook"""
+        for name, attrs in (
+            (self.TITLE_STYLE, dict(font=self.TITLE_FONT)),
+            (self.HEADING_STYLE, dict(font=self.HEADER_FONT)),
+            (self.TABLE_HEADER_STYLE, dict(font=self.TABLE_HEADER_FONT, border=self.THIN_BORDER, fill=self.HEADER_FILL)),
+            (self.ITEM_TEXT_STYLE, dict(border=self.THIN_BORDER)),
+            (self.ITEM_NUMBER_STYLE, dict(border=self.THIN_BORDER, alignment=self.RIGHT_ALIGN)),
+            (self.TOTALS_LABEL_STYLE, dict(font=self.TABLE_HEADER_FONT, border=self.THIN_BORDER, fill=self.TOTALS_FILL)),
+            (self.TOTALS_VALUE_STYLE, dict(border=self.THIN_BORDER, fill=self.TOTALS_FILL, alignment=self.RIGHT_ALIGN)),
+        ):
+            wb.add_named_style(NamedStyle(name=name, **attrs))
     
-    def generate_customers_report(self, customers, filename=None):
-        """Generate Excel report for customers"""
+    def _save_workbook(self, wb, target):
+        """Save a workbook, deflating at the fastest level when fast_compress is set"""
         try:
-            if not filename:
-                filename = f"customers_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Prepare data
-            data = []
-            for customer in customers:
-                data.append({
-                    'Customer Name': customer.name,
-                    'Address': customer.address or '',
-                    'City': customer.city or '',
-                    'State': customer.state or '',
-                    'PIN Code': customer.pincode or '',
-                    'GSTIN': customer.gstin or '',
-                    'Contact Person': customer.contact_person or '',
-                    'Phone': customer.phone or '',
-                    'Email': customer.email or '',
-                    'Created Date': customer.created_at.strftime('%d-%m-%Y') if customer.created_at else '',
-                    'Invoice Count': len(customer.invoices)
-                })
-            
-            # Create DataFrame
-            df = pd.DataFrame(data)
-            
-            # Create workbook and save
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Customers', index=False)
-                
-                # Get workbook and worksheet
-                workbook = writer.book
-                worksheet = writer.sheets['Customers']
-                
-                # Style header
-                for col in range(1, len(df.columns) + 1):
-                    cell = worksheet.cell(row=1, column=col)
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    length = max(len(str(cell.value)) for cell in column)
-                    worksheet.column_dimensions[column[0].column_letter].width = min(length + 2, 50)
-            
-            return filepath
-            
-        except Exception as e:
-            raise Exception(f"Error generating customers report: {str(e)}")
+            if not self.fast_compress or ExcelWriter is None:
+                wb.save(target)
+                return
+            
+            # Same steps as Workbook.save and openpyxl's save_workbook, but with a level 1 zip archive
+            # instead of zlib's default level 6
+            if wb.write_only and not wb.worksheets:
+                wb.create_sheet()
+            archive = ZipFile(target, 'w', ZIP_DEFLATED, allowZip64=True, compresslevel=1)
+            wb.properties.modified = datetime.utcnow()
+            ExcelWriter(wb, archive).save()
+        except OSError as e:
+            # Disk full, permission denied and the like are logged and re-raised unchanged for the caller
+            logger.error("Could not save Excel file %s: %s", target, e)
+            raise
+    
+    def _detail_rows(self, ws, record, fields, label_style=None):
+        """Build label/value rows for the fields of record that have a value or are always shown"""
+        rows = []
+        for label, get_value, always in fields:
+            value = get_value(record)
+            if value or always:
+                rows.append([self._named_cell(ws, label, label_style) if label_style else label, value])
+        return rows
+    
+    @staticmethod
+    def _named_cell(ws, value, style):
+        """Build a cell for ws.append that takes one of the workbook's named styles"""
+        cell = Cell(ws, value=value)
+        cell.style = style
+        return cell
+    
+    @staticmethod
+    def _styled_cell(ws, value, font=None, fill=None, border=None):
+        """Build a write-only cell carrying the given styles"""
+        cell = WriteOnlyCell(ws, value=value)
+        if font:
+            cell.font = font
+        if fill:
+            cell.fill = fill
+        if border:
+            cell.border = border
+        return cell
     
-    def generate_products_report(self, products, filename=None):
-        """Generate Excel report for products"""
+    @staticmethod
+    def _with_date_cells(ws, row, date_columns):
+        """Wrap a row's dates in cells carrying the report date format"""
+        row = list(row)
+        for index in date_columns:
+            if row[index]:
+                cell = WriteOnlyCell(ws, value=row[index])
+                cell.number_format = REPORT_DATE_FORMAT
+                row[index] = cell
+        return row
+    
+    @staticmethod
+    def _sample_rows(rows):
+        """Split rows into a buffered head to size columns from and an iterator over the rest"""
+        rows = iter(rows)
+        head = list(islice(rows, WIDTH_SAMPLE_ROWS))
+        
+        # openpyxl only streams sheets through lxml; without it large reports are markedly slower
+        if not LXML and len(head) == WIDTH_SAMPLE_ROWS:
+            logger.warning("lxml is not installed; writing a report of %d+ rows with openpyxl's slower XML writer",
+                           WIDTH_SAMPLE_ROWS)
+        return head, rows
+    
+    @staticmethod
+    def _set_column_widths(ws, rows):
+        """Size each column to its longest value (capped at 50); write-only sheets need this before the first append"""
+        # One pass keeping a running maximum per column, rather than transposing every row
+        widths = []
+        for row in rows:
+            if len(row) > len(widths):
+                widths.extend([0] * (len(row) - len(widths)))
+            for index, value in enumerate(row):
+                # Dates display as DD-MM-YYYY whatever their str() looks like
+                length = len(REPORT_DATE_FORMAT) if isinstance(value, date) else len(str(value))
+                if length > widths[index]:
+                    widths[index] = length
+        
+        for index, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(index)].width = min(width + 2, 50)
+    
+    def generate_invoices_report(self, invoices, filename=None):
+        """Generate Excel report for multiple invoices; load them with joinedload(Invoice.customer) to avoid a query per row"""
+        if not filename:
+            filename = f"invoices_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        
+        filepath = os.path.join(self.output_dir, filename)
+        
+        # Prepare data; invoices may be any iterable, e.g. a Query with yield_per(), and are read once
+        head, rest = self._sample_rows(map(_invoice_report_row, invoices))
+        generated_on = f"Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}"
+        
+        # Create a write-only workbook; rows are streamed out instead of kept as cell objects
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Invoices Report")
+        self._set_column_widths(ws, [["INVOICES REPORT"], [generated_on], INVOICE_REPORT_HEADERS, *head])
+        
+        # Add title
+        ws.append([self._styled_cell(ws, "INVOICES REPORT", font=self.TITLE_FONT)])
+        ws.append([generated_on])
+        ws.append([])
+        
+        # Add data with a styled header row
+        ws.append([self._styled_cell(ws, header, font=self.BOLD_FONT, fill=self.HEADER_FILL,
+                                     border=self.THIN_BORDER)
+                   for header in INVOICE_REPORT_HEADERS])
+        
+        # Summary figures are gathered while the rows are written
+        total_invoices = 0
+        total_amount = 0
+        status_counts = Counter()
+        
+        for row in chain(head, rest):
+            ws.append(self._with_date_cells(ws, row, INVOICE_DATE_COLUMNS))
+            total_invoices += 1
+            total_amount += row[INVOICE_TOTAL_COLUMN]
+            status_counts[row[INVOICE_STATUS_COLUMN]] += 1
+        
+        # Add summary sheet
+        ws_summary = wb.create_sheet("Summary")
+        
+        # Summary calculations
+        draft_count = status_counts['DRAFT']
+        sent_count = status_counts['SENT']
+        paid_count = status_counts['PAID']
+        cancelled_count = status_counts['CANCELLED']
+        
+        # Add summary data
+        summary_data = [
+            ['Invoice Summary', ''],
+            ['Total Invoices', total_invoices],
+            ['Total Amount', total_amount],
+            ['', ''],
+            ['Status Breakdown', ''],
+            ['Draft', draft_count],
+            ['Sent', sent_count],
+            ['Paid', paid_count],
+            ['Cancelled', cancelled_count]
+        ]
+        
+        for label, value in summary_data:
+            ws_summary.append([self._styled_cell(ws_summary, label, font=self.BOLD_FONT), value])
+        
+        # Save workbook
+        self._save_workbook(wb, filepath)
+        
+        return filepath
+    
+    def generate_customers_report(self, customers, filename=None, invoice_counts=None):
+        """Generate Excel report for customers; invoice_counts maps customer id to invoice count"""
+        if not filename:
+            filename = f"customers_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        
+        filepath = os.path.join(self.output_dir, filename)
+        
+        # Prepare data; customers may be any iterable and are read once
+        # Without precomputed counts each customer's invoices are loaded, one query per customer
+        if invoice_counts is None:
+            rows = (_customer_report_row(customer, len(customer.invoices)) for customer in customers)
+        else:
+            rows = (_customer_report_row(customer, invoice_counts.get(customer.id, 0)) for customer in customers)
+        head, rest = self._sample_rows(rows)
+        
+        # Create a write-only workbook; rows are streamed out instead of kept as cell objects
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Customers')
+        self._set_column_widths(ws, [CUSTOMER_REPORT_HEADERS, *head])
+        
+        # Add data with a styled header row
+        ws.append([self._styled_cell(ws, header, font=self.BOLD_FONT, fill=self.HEADER_FILL)
+                   for header in CUSTOMER_REPORT_HEADERS])
+        for row in chain(head, rest):
+            ws.append(self._with_date_cells(ws, row, CUSTOMER_DATE_COLUMNS))
+        
+        # Save workbook
+        self._save_workbook(wb, filepath)
+        
+        return filepath
+    
+    def generate_products_report(self, products, filename=None, usage_counts=None):
+        """Generate Excel report for products; usage_counts maps product id to invoice item count"""
+        if not filename:
+            filename = f"products_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        
+        filepath = os.path.join(self.output_dir, filename)
+        
+        # Prepare data; products may be any iterable and are read once
+        # Without precomputed counts each product's invoice items are loaded, one query per product
+        if usage_counts is None:
+            rows = (_product_report_row(product, len(product.invoice_items)) for product in products)
+        else:
+            rows = (_product_report_row(product, usage_counts.get(product.id, 0)) for product in products)
+        head, rest = self._sample_rows(rows)
+        generated_on = f"Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}"
+        
+        # Create a write-only workbook; rows are streamed out instead of kept as cell objects
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Products Report")
+        self._set_column_widths(ws, [["PRODUCTS REPORT"], [generated_on], PRODUCT_REPORT_HEADERS, *head])
+        
+        # Add title
+        ws.append([self._styled_cell(ws, "PRODUCTS REPORT", font=self.TITLE_FONT)])
+        ws.append([generated_on])
+        ws.append([])
+        
+        # Add data with a styled header row
+        ws.append([self._styled_cell(ws, header, font=self.BOLD_FONT, fill=self.HEADER_FILL,
+                                     border=self.THIN_BORDER)
+                   for header in PRODUCT_REPORT_HEADERS])
+        
+        # Group by category while the rows are written, keeping [product count, rated product count, rate total]
+        category_stats = defaultdict(lambda: [0, 0, 0.0])
+        
+        for row in chain(head, rest):
+            ws.append(self._with_date_cells(ws, row, PRODUCT_DATE_COLUMNS))
+            stats = category_stats[row[PRODUCT_CATEGORY_COLUMN] or 'Uncategorized']
+            stats[0] += 1
+            if row[PRODUCT_RATE_COLUMN]:
+                stats[1] += 1
+                stats[2] += row[PRODUCT_RATE_COLUMN]
+        
+        # Add category analysis sheet
+        ws_categories = wb.create_sheet("Categories")
+        
+        # Add category analysis
+        ws_categories.append([
+            self._styled_cell(ws_categories, "CATEGORY ANALYSIS", font=self.HEADER_FONT)
+        ])
+        ws_categories.append([])
+        ws_categories.append([
+            self._styled_cell(ws_categories, label, font=self.BOLD_FONT)
+            for label in ("Category", "Product Count", "Average Rate")
+        ])
+        
+        # Average only over the products that have a rate
+        for category, (count, rated, rate_total) in category_stats.items():
+            ws_categories.append([category, count, round(rate_total / rated, 2) if rated else 0])
+        
+        # Save workbook
+        self._save_workbook(wb, filepath)
+        
+        return filepath
+    
+    def generate_all_reports(self, invoices, customers, products, invoice_counts=None, usage_counts=None):
+        """Generate the invoices, customers and products reports concurrently; returns their paths by report name"""
+        # The database session is not thread safe, so model data is copied out here before the workers start
+        invoice_snapshots = []
+        for invoice in invoices:
+            invoice_snapshot = snapshot(invoice)
+            invoice_snapshot.customer = snapshot(invoice.customer)
+            invoice_snapshots.append(invoice_snapshot)
+        
+        customers = list(customers)
+        products = list(products)
+        if invoice_counts is None:
+            invoice_counts = {customer.id: len(customer.invoices) for customer in customers}
+        if usage_counts is None:
+            usage_counts = {product.id: len(product.invoice_items) for product in products}
+        
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                'invoices': executor.submit(self.generate_invoices_report, invoice_snapshots),
+                'customers': executor.submit(self.generate_customers_report, list(map(snapshot, customers)),
+                                             invoice_counts=invoice_counts),
+                'products': executor.submit(self.generate_products_report, list(map(snapshot, products)),
+                                            usage_counts=usage_counts)
+            }
+            return {name: future.result() for name, future in futures.items()}
+    
+    def generate_excel_buffer(self, data, headers, sheet_name="Data", use_spooled=False):
+        """Generate Excel file in memory and return as BytesIO buffer (or a disk-spilling SpooledBuffer)"""
+        buffer = SpooledBuffer() if use_spooled else BytesIO()
+        self._write_data_workbook(buffer, data, headers, sheet_name)
+        
+        buffer.seek(0)
+        return buffer
+    
+    def stream_excel(self, data, headers, sheet_name="Data", chunk_size=STREAM_CHUNK_SIZE):
+        """Generate Excel file in a temporary file and return a generator of its bytes, e.g. for a streamed Response"""
+        spool = TemporaryFile()
         try:
-            if not filename:
-                filename = f"products_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Prepare data
-            data = []
-            for product in products:
-                data.append({
-                    'Category': product.category or '',
-                    'Product Name': product.name,
-                    'Description': product.description or '',
-                    'Unit': product.unit,
-                    'Rate': float(product.rate) if product.rate else 0,
-                    'HSN Code': product.hsn_code or '',
-                    'Created Date': product.created_at.strftime('%d-%m-%Y') if product.created_at else '',
-                    'Usage Count': len(product.invoice_items)
-                })
-            
-            # Create DataFrame
-            df = pd.DataFrame(data)
-            
-            # Create workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Products Report"
-            
-            # Add title
-            ws.cell(row=1, column=1, value="PRODUCTS REPORT").font = Font(bold=True, size=16)
-            ws.cell(row=2, column=1, value=f"Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}")
-            
-            # Add data
-            for r in dataframe_to_rows(df, index=False, header=True):
-                ws.append(r)
-            
-            # Style header
-            header_row = 4
-            for col in range(1, len(df.columns) + 1):
-                cell = ws.cell(row=header_row, column=col)
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-                cell.border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                                   top=Side(style='thin'), bottom=Side(style='thin'))
-            
-            # Auto-adjust column widths
-            for column in ws.columns:
-                length = max(len(str(cell.value)) for cell in column)
-                ws.column_dimensions[column[0].column_letter].width = min(length + 2, 50)
-            
-            # Add category analysis sheet
-            ws_categories = wb.create_sheet("Categories")
-            
-            # Group by category
-            category_counts = {}
-            category_avg_rates = {}
-            
-            for product in products:
-                category = product.category or 'Uncategorized'
-                if category not in category_counts:
-                    category_counts[category] = 0
-                    category_avg_rates[category] = []
-                
-                category_counts[category] += 1
-                if product.rate:
-                    category_avg_rates[category].append(float(product.rate))
-            
-            # Calculate averages
-            for category in category_avg_rates:
-                if category_avg_rates[category]:
-                    category_avg_rates[category] = sum(category_avg_rates[category]) / len(category_avg_rates[category])
-                else:
-                    category_avg_rates[category] = 0
-            
-            # Add category analysis
-            ws_categories.cell(row=1, column=1, value="CATEGORY ANALYSIS").font = Font(bold=True, size=14)
-            ws_categories.cell(row=3, column=1, value="Category").font = Font(bold=True)
-            ws_categories.cell(row=3, column=2, value="Product Count").font = Font(bold=True)
-            ws_categories.cell(row=3, column=3, value="Average Rate").font = Font(bold=True)
-            
-            row = 4
-            for category, count in category_counts.items():
-                ws_categories.cell(row=row, column=1, value=category)
-                ws_categories.cell(row=row, column=2, value=count)
-                ws_categories.cell(row=row, column=3, value=round(category_avg_rates[category], 2))
-                row += 1
-            
-            # Save workbook
-            wb.save(filepath)
-            
-            return filepath
-            
-        except Exception as e:
-            raise Exception(f"Error generating products report: {str(e)}")
+            self._write_data_workbook(spool, data, headers, sheet_name)
+        except Exception:
+            spool.close()
+            raise
+        
+        return self._read_chunks(spool, chunk_size)
+    
+    def _write_data_workbook(self, target, data, headers, sheet_name):
+        """Write rows under a styled header row as a single-sheet workbook"""
+        head, rest = self._sample_rows(_data_row(row, headers) for row in data)
+        
+        # Create a write-only workbook; rows are streamed out instead of kept as cell objects
+        wb = Workbook(write_only=True)
+        worksheet = wb.create_sheet(sheet_name)
+        self._set_column_widths(worksheet, [headers, *head])
+        
+        # Add data with a styled header row
+        worksheet.append([self._styled_cell(worksheet, header, font=self.BOLD_FONT, fill=self.HEADER_FILL)
+                          for header in headers])
+        for row in chain(head, rest):
+            if len(row) != len(headers):
+                raise ValueError(f"Every row must have {len(headers)} values, one per header")
+            worksheet.append(row)
+        
+        self._save_workbook(wb, target)
     
-    def generate_excel_buffer(self, data, headers, sheet_name="Data"):
-        """Generate Excel file in memory and return as BytesIO buffer"""
+    @staticmethod
+    def _read_chunks(file, chunk_size):
+        """Yield a file from the start in chunk_size blocks, closing it once exhausted or abandoned"""
         try:
-            buffer = BytesIO()
-            
-            # Create DataFrame
-            df = pd.DataFrame(data, columns=headers)
-            
-            # Write to buffer
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # Get workbook and worksheet
-                workbook = writer.book
-                worksheet = writer.sheets[sheet_name]
-                
-                # Style header
-                for col in range(1, len(headers) + 1):
-                    cell = worksheet.cell(row=1, column=col)
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    length = max(len(str(cell.value)) for cell in column)
-                    worksheet.column_dimensions[column[0].column_letter].width = min(length + 2, 50)
-            
-            buffer.seek(0)
-            return buffer
-            
-        except Exception as e:
-            raise Exception(f"Error generating Excel buffer: {str(e)}")
\ No newline at end of file
+            file.seek(0)
+            while chunk := file.read(chunk_size):
+                yield chunk
+        finally:
+            file.close()
+
+@lru_cache(maxsize=16)
+def _shared_excel_generator(output_dir):
+    """Build the Excel generator shared by every caller writing to output_dir"""
+    return ExcelGenerator(output_dir)
+
+def get_excel_generator(output_dir='generated_files'):
+    """Get the shared Excel generator for an output directory"""
+    generator = _shared_excel_generator(output_dir)
+    # The directory may have been removed since the generator was first built
+    generator.ensure_output_dir()
+    return generator
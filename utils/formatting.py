@@ -0,0 +1,48 @@
+"""
+Formatting Helpers
+Date, number and address formatting shared by the PDF and Excel generators
+"""
+
+from datetime import date
+from functools import lru_cache
+
+@lru_cache(maxsize=1024)
+def _format_ordinal(ordinal):
+    """Format a proleptic Gregorian ordinal as DD-MM-YYYY"""
+    return date.fromordinal(ordinal).strftime('%d-%m-%Y')
+
+def format_date(value):
+    """Format a date or datetime as DD-MM-YYYY, empty when missing"""
+    return _format_ordinal(value.toordinal()) if value else ''
+
+@lru_cache(maxsize=4096)
+def format_currency(amount):
+    """Format an amount in rupees with two decimals"""
+    return f"₹{float(amount):.2f}" if amount else '₹0.00'
+
+@lru_cache(maxsize=1024)
+def format_quantity(quantity):
+    """Format a quantity with two decimals"""
+    return f"{float(quantity):.2f}" if quantity else '0.00'
+
+@lru_cache(maxsize=1024)
+def format_percent(percent):
+    """Format a percentage with one decimal"""
+    return f"{float(percent):.1f}%" if percent else '0.0%'
+
+def company_header_lines(company):
+    """Get the address and contact lines printed under the company name"""
+    lines = []
+    if company.address:
+        lines.append(company.address)
+    if company.city and company.state:
+        lines.append(f"{company.city}, {company.state}")
+    if company.pincode:
+        lines.append(f"PIN: {company.pincode}")
+    if company.gstin:
+        lines.append(f"GSTIN: {company.gstin}")
+    if company.contact_phone:
+        lines.append(f"Phone: {company.contact_phone}")
+    if company.email:
+        lines.append(f"Email: {company.email}")
+    return lines
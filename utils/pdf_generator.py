@@ -4,7 +4,11 @@ Handles PDF generation for invoices and reports
 """
 
 import os
+from copy import copy
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
 from io import BytesIO
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -14,7 +18,134 @@ from reportlab.lib.colors import black, blue, red, grey
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
-from num2words import num2words
+from .buffers import SpooledBuffer
+from .formatting import company_header_lines, format_currency, format_date, format_percent, format_quantity
+from .snapshots import snapshot
+
+# Paragraph and table styles are read-only once built, so every document shares one set
+_SAMPLE_STYLES = getSampleStyleSheet()
+NORMAL_STYLE = _SAMPLE_STYLES['Normal']
+
+INVOICE_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_SAMPLE_STYLES['Heading1'],
+    fontSize=24,
+    textColor=blue,
+    alignment=TA_CENTER,
+    spaceAfter=20
+)
+
+HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_SAMPLE_STYLES['Heading2'],
+    fontSize=14,
+    textColor=black,
+    alignment=TA_LEFT,
+    spaceAfter=10
+)
+
+REPORT_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_SAMPLE_STYLES['Heading1'],
+    fontSize=18,
+    textColor=blue,
+    alignment=TA_CENTER,
+    spaceAfter=20
+)
+
+# Two-column label/value tables (invoice details, banking details)
+DETAILS_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+])
+
+ITEMS_TABLE_STYLE = TableStyle([
+    # Header styling
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    
+    # Data styling
+    ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # S.No. center
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Description left
+    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),  # Numbers right
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -4), [colors.beige, colors.white]),
+    
+    # Totals styling
+    ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, -3), (-1, -1), colors.lightgrey),
+    
+    # Grid
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+REPORT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+# Fixed terms printed on every invoice; the first entry is rendered as a heading
+INVOICE_TERMS = (
+    "Terms & Conditions:",
+    "1. GST 18% extra as applicable.",
+    "2. Payment Terms: 30 Days Net from the date of Invoice.",
+    "3. Delivery Lead Time: 2-3 Weeks",
+    "4. Packing & Forwarding Charges: Nil",
+    "5. Freight: Nil",
+    "6. Validity: One Year"
+)
+
+# Fixed paragraphs are parsed once; each invoice lays out its own shallow copies
+TAX_INVOICE_PARAGRAPH = Paragraph("<b>TAX INVOICE</b>", HEADING_STYLE)
+TERMS_PARAGRAPHS = (Paragraph(INVOICE_TERMS[0], HEADING_STYLE),) + tuple(
+    Paragraph(term, NORMAL_STYLE) for term in INVOICE_TERMS[1:]
+)
+SIGNATORY_PARAGRAPH = Paragraph("Authorized Signatory", NORMAL_STYLE)
+
+@lru_cache(maxsize=4096)
+def _amount_in_words(paise):
+    """Spell out an amount given in paise, e.g. for the invoice total"""
+    # Imported on first use so report-only callers skip the ~25ms num2words import
+    from num2words import num2words
+    
+    return num2words(paise / 100, lang='en_IN').title()
+
+@lru_cache(maxsize=64)
+def _company_header_paragraphs(name, lines):
+    """Parse a company's name and header lines into paragraphs, keyed on their text so edits need no invalidation"""
+    return (Paragraph(f"<b>{name}</b>", INVOICE_TITLE_STYLE),) + tuple(Paragraph(line, NORMAL_STYLE) for line in lines)
+
+def _invoice_item_row(index, item):
+    """Format an invoice item as a row of the PDF items table"""
+    product = item.product
+    return [
+        str(index),
+        item.description or '',
+        product.hsn_code or '' if product else '',
+        format_quantity(item.quantity),
+        item.unit or '',
+        format_currency(item.rate),
+        format_percent(item.discount_percent),
+        format_currency(item.amount)
+    ]
+
+def _render_invoice_pdf(output_dir, invoice, company, customer):
+    """Render one invoice PDF in a batch worker process"""
+    return PDFGenerator(output_dir).generate_invoice_pdf(invoice, company, customer)
 
 class PDFGenerator:
     """PDF generation utility class"""
@@ -25,431 +156,165 @@ class PDFGenerator:
         
     def ensure_output_dir(self):
         """Ensure output directory exists"""
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
     
     def generate_invoice_pdf(self, invoice, company=None, customer=None):
-        """Generate PDF for an invoice"""
+        """Generate PDF for an invoice; load items with selectinload(Invoice.items).joinedload(InvoiceItem.product) to avoid a query per item"""
         try:
             # Create filename
             filename = f"invoice_{invoice.invoice_number.replace('/', '_')}.pdf"
             filepath = os.path.join(self.output_dir, filename)
             
-            # Create document
-            doc = SimpleDocTemplate(filepath, pagesize=A4, topMargin=0.5*inch)
-            story = []
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor=blue,
-                alignment=TA_CENTER,
-                spaceAfter=20
-            )
-            
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                textColor=black,
-                alignment=TA_LEFT,
-                spaceAfter=10
-            )
-            
-            normal_style = styles['Normal']
-            
-            # Company Header
-            if company:
-                story.append(Paragraph(f"<b>{company.name}</b>", title_style))
-                
-                company_info = []
-                if company.address:
-                    company_info.append(company.address)
-                if company.city and company.state:
-                    company_info.append(f"{company.city}, {company.state}")
-                if company.pincode:
-                    company_info.append(f"PIN: {company.pincode}")
-                if company.gstin:
-                    company_info.append(f"GSTIN: {company.gstin}")
-                if company.contact_phone:
-                    company_info.append(f"Phone: {company.contact_phone}")
-                if company.email:
-                    company_info.append(f"Email: {company.email}")
-                
-                for info in company_info:
-                    story.append(Paragraph(info, normal_style))
-                
-                story.append(Spacer(1, 20))
-            
-            # Invoice Title
-            story.append(Paragraph("<b>TAX INVOICE</b>", heading_style))
-            story.append(Spacer(1, 10))
-            
-            # Invoice Details Table
-            invoice_details = [
-                ['Invoice Number:', invoice.invoice_number],
-                ['Invoice Date:', invoice.invoice_date.strftime('%d-%m-%Y') if invoice.invoice_date else ''],
-                ['PO Number:', invoice.po_number or ''],
-                ['PO Date:', invoice.po_date.strftime('%d-%m-%Y') if invoice.po_date else ''],
-                ['Payment Mode:', invoice.payment_mode or ''],
-                ['Transport:', invoice.transport or ''],
-                ['Dispatch From:', invoice.dispatch_from or '']
-            ]
-            
-            # Customer details
-            if customer:
-                invoice_details.extend([
-                    ['', ''],  # Empty row
-                    ['Bill To:', ''],
-                    ['Customer:', customer.name],
-                    ['Address:', customer.address or ''],
-                    ['City, State:', f"{customer.city or ''}, {customer.state or ''}"],
-                    ['PIN Code:', customer.pincode or ''],
-                    ['GSTIN:', customer.gstin or ''],
-                    ['Contact Person:', customer.contact_person or ''],
-                    ['Phone:', customer.phone or '']
-                ])
-            
-            invoice_table = Table(invoice_details, colWidths=[2*inch, 4*inch])
-            invoice_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ]))
-            
-            story.append(invoice_table)
-            story.append(Spacer(1, 20))
-            
-            # Items Table
-            if invoice.items:
-                # Table headers
-                headers = ['S.No.', 'Description', 'HSN', 'Qty', 'Unit', 'Rate', 'Discount %', 'Amount']
-                items_data = [headers]
-                
-                # Add items
-                for i, item in enumerate(invoice.items, 1):
-                    hsn_code = ''
-                    if item.product and item.product.hsn_code:
-                        hsn_code = item.product.hsn_code
-                    
-                    items_data.append([
-                        str(i),
-                        item.description or '',
-                        hsn_code,
-                        f"{float(item.quantity):.2f}" if item.quantity else '0.00',
-                        item.unit or '',
-                        f"₹{float(item.rate):.2f}" if item.rate else '₹0.00',
-                        f"{float(item.discount_percent):.1f}%" if item.discount_percent else '0.0%',
-                        f"₹{float(item.amount):.2f}" if item.amount else '₹0.00'
-                    ])
-                
-                # Add totals
-                items_data.extend([
-                    ['', '', '', '', '', '', 'Subtotal:', f"₹{float(invoice.subtotal):.2f}" if invoice.subtotal else '₹0.00'],
-                    ['', '', '', '', '', '', 'GST (18%):', f"₹{float(invoice.gst_amount):.2f}" if invoice.gst_amount else '₹0.00'],
-                    ['', '', '', '', '', '', 'Total:', f"₹{float(invoice.total_amount):.2f}" if invoice.total_amount else '₹0.00']
-                ])
-                
-                items_table = Table(items_data, colWidths=[0.5*inch, 2.5*inch, 0.8*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch, 1.2*inch])
-                items_table.setStyle(TableStyle([
-                    # Header styling
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    
-                    # Data styling
-                    ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # S.No. center
-                    ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Description left
-                    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),  # Numbers right
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -4), [colors.beige, colors.white]),
-                    
-                    # Totals styling
-                    ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
-                    ('BACKGROUND', (0, -3), (-1, -1), colors.lightgrey),
-                    
-                    # Grid
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ]))
-                
-                story.append(items_table)
-                story.append(Spacer(1, 20))
-            
-            # Amount in words
-            if invoice.total_amount:
-                amount_words = num2words(float(invoice.total_amount), lang='en_IN').title()
-                story.append(Paragraph(f"<b>Amount in Words:</b> {amount_words} Rupees Only", normal_style))
-                story.append(Spacer(1, 20))
-            
-            # Banking details
-            if company and company.bank_name:
-                story.append(Paragraph("<b>Banking Details:</b>", heading_style))
-                banking_details = [
-                    ['Bank Name:', company.bank_name],
-                    ['Account Number:', company.account_number or ''],
-                    ['IFSC Code:', company.ifsc_code or '']
-                ]
-                
-                banking_table = Table(banking_details, colWidths=[2*inch, 4*inch])
-                banking_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ]))
-                
-                story.append(banking_table)
-                story.append(Spacer(1, 20))
-            
-            # Terms and conditions
-            terms = [
-                "Terms & Conditions:",
-                "1. GST 18% extra as applicable.",
-                "2. Payment Terms: 30 Days Net from the date of Invoice.",
-                "3. Delivery Lead Time: 2-3 Weeks",
-                "4. Packing & Forwarding Charges: Nil",
-                "5. Freight: Nil",
-                "6. Validity: One Year"
-            ]
-            
-            for term in terms:
-                style = heading_style if term.startswith('Terms') else normal_style
-                story.append(Paragraph(term, style))
-            
-            story.append(Spacer(1, 30))
-            
-            # Signature
-            story.append(Paragraph("<b>For " + (company.name if company else "Company") + "</b>", normal_style))
-            story.append(Spacer(1, 50))
-            story.append(Paragraph("Authorized Signatory", normal_style))
-            
-            # Build PDF
-            doc.build(story)
+            self._build_invoice_document(filepath, invoice, company, customer)
             
             return filepath
             
         except Exception as e:
             raise Exception(f"Error generating PDF: {str(e)}")
     
-    def generate_invoice_pdf_buffer(self, invoice, company=None, customer=None):
-        """Generate PDF for an invoice and return as BytesIO buffer"""
+    def generate_invoice_pdf_buffer(self, invoice, company=None, customer=None, use_spooled=False):
+        """Generate PDF for an invoice and return as BytesIO buffer (or a disk-spilling SpooledBuffer); eager-load items as for generate_invoice_pdf"""
         try:
-            buffer = BytesIO()
-            
-            # Create document
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch)
-            story = []
+            buffer = SpooledBuffer() if use_spooled else BytesIO()
             
-            # Get styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                textColor=blue,
-                alignment=TA_CENTER,
-                spaceAfter=20
-            )
+            self._build_invoice_document(buffer, invoice, company, customer)
             
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                textColor=black,
-                alignment=TA_LEFT,
-                spaceAfter=10
-            )
-            
-            normal_style = styles['Normal']
-            
-            # Company Header
-            if company:
-                story.append(Paragraph(f"<b>{company.name}</b>", title_style))
-                
-                company_info = []
-                if company.address:
-                    company_info.append(company.address)
-                if company.city and company.state:
-                    company_info.append(f"{company.city}, {company.state}")
-                if company.pincode:
-                    company_info.append(f"PIN: {company.pincode}")
-                if company.gstin:
-                    company_info.append(f"GSTIN: {company.gstin}")
-                if company.contact_phone:
-                    company_info.append(f"Phone: {company.contact_phone}")
-                if company.email:
-                    company_info.append(f"Email: {company.email}")
-                
-                for info in company_info:
-                    story.append(Paragraph(info, normal_style))
-                
-                story.append(Spacer(1, 20))
-            
-            # Invoice Title
-            story.append(Paragraph("<b>TAX INVOICE</b>", heading_style))
-            story.append(Spacer(1, 10))
-            
-            # Invoice Details Table
-            invoice_details = [
-                ['Invoice Number:', invoice.invoice_number],
-                ['Invoice Date:', invoice.invoice_date.strftime('%d-%m-%Y') if invoice.invoice_date else ''],
-                ['PO Number:', invoice.po_number or ''],
-                ['PO Date:', invoice.po_date.strftime('%d-%m-%Y') if invoice.po_date else ''],
-                ['Payment Mode:', invoice.payment_mode or ''],
-                ['Transport:', invoice.transport or ''],
-                ['Dispatch From:', invoice.dispatch_from or '']
-            ]
-            
-            # Customer details
-            if customer:
-                invoice_details.extend([
-                    ['', ''],  # Empty row
-                    ['Bill To:', ''],
-                    ['Customer:', customer.name],
-                    ['Address:', customer.address or ''],
-                    ['City, State:', f"{customer.city or ''}, {customer.state or ''}"],
-                    ['PIN Code:', customer.pincode or ''],
-                    ['GSTIN:', customer.gstin or ''],
-                    ['Contact Person:', customer.contact_person or ''],
-                    ['Phone:', customer.phone or '']
-                ])
+            buffer.seek(0)
+            return buffer
             
-            invoice_table = Table(invoice_details, colWidths=[2*inch, 4*inch])
-            invoice_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ]))
+        except Exception as e:
+            raise Exception(f"Error generating PDF buffer: {str(e)}")
+    
+    def _build_invoice_document(self, target, invoice, company, customer):
+        """Lay out an invoice and write it as a PDF to a file path or file object"""
+        doc = SimpleDocTemplate(target, pagesize=A4, topMargin=0.5*inch)
+        doc.build(self._build_invoice_story(invoice, company, customer))
+    
+    def _build_invoice_story(self, invoice, company, customer):
+        """Build the flowables of an invoice PDF"""
+        story = []
+        
+        # Company Header
+        if company:
+            header = _company_header_paragraphs(company.name, tuple(company_header_lines(company)))
+            story.extend(map(copy, header))
             
-            story.append(invoice_table)
             story.append(Spacer(1, 20))
-            
-            # Items Table
-            if invoice.items:
-                # Table headers
-                headers = ['S.No.', 'Description', 'HSN', 'Qty', 'Unit', 'Rate', 'Discount %', 'Amount']
-                items_data = [headers]
-                
-                # Add items
-                for i, item in enumerate(invoice.items, 1):
-                    hsn_code = ''
-                    if item.product and item.product.hsn_code:
-                        hsn_code = item.product.hsn_code
-                    
-                    items_data.append([
-                        str(i),
-                        item.description or '',
-                        hsn_code,
-                        f"{float(item.quantity):.2f}" if item.quantity else '0.00',
-                        item.unit or '',
-                        f"₹{float(item.rate):.2f}" if item.rate else '₹0.00',
-                        f"{float(item.discount_percent):.1f}%" if item.discount_percent else '0.0%',
-                        f"₹{float(item.amount):.2f}" if item.amount else '₹0.00'
-                    ])
-                
-                # Add totals
-                items_data.extend([
-                    ['', '', '', '', '', '', 'Subtotal:', f"₹{float(invoice.subtotal):.2f}" if invoice.subtotal else '₹0.00'],
-                    ['', '', '', '', '', '', 'GST (18%):', f"₹{float(invoice.gst_amount):.2f}" if invoice.gst_amount else '₹0.00'],
-                    ['', '', '', '', '', '', 'Total:', f"₹{float(invoice.total_amount):.2f}" if invoice.total_amount else '₹0.00']
-                ])
-                
-                items_table = Table(items_data, colWidths=[0.5*inch, 2.5*inch, 0.8*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch, 1.2*inch])
-                items_table.setStyle(TableStyle([
-                    # Header styling
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    
-                    # Data styling
-                    ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # S.No. center
-                    ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Description left
-                    ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),  # Numbers right
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -4), [colors.beige, colors.white]),
-                    
-                    # Totals styling
-                    ('FONTNAME', (0, -3), (-1, -1), 'Helvetica-Bold'),
-                    ('BACKGROUND', (0, -3), (-1, -1), colors.lightgrey),
-                    
-                    # Grid
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ]))
-                
-                story.append(items_table)
-                story.append(Spacer(1, 20))
-            
-            # Amount in words
-            if invoice.total_amount:
-                amount_words = num2words(float(invoice.total_amount), lang='en_IN').title()
-                story.append(Paragraph(f"<b>Amount in Words:</b> {amount_words} Rupees Only", normal_style))
-                story.append(Spacer(1, 20))
-            
-            # Banking details
-            if company and company.bank_name:
-                story.append(Paragraph("<b>Banking Details:</b>", heading_style))
-                banking_details = [
-                    ['Bank Name:', company.bank_name],
-                    ['Account Number:', company.account_number or ''],
-                    ['IFSC Code:', company.ifsc_code or '']
-                ]
-                
-                banking_table = Table(banking_details, colWidths=[2*inch, 4*inch])
-                banking_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ]))
-                
-                story.append(banking_table)
-                story.append(Spacer(1, 20))
-            
-            # Terms and conditions
-            terms = [
-                "Terms & Conditions:",
-                "1. GST 18% extra as applicable.",
-                "2. Payment Terms: 30 Days Net from the date of Invoice.",
-                "3. Delivery Lead Time: 2-3 Weeks",
-                "4. Packing & Forwarding Charges: Nil",
-                "5. Freight: Nil",
-                "6. Validity: One Year"
+        
+        # Invoice Title
+        story.append(copy(TAX_INVOICE_PARAGRAPH))
+        story.append(Spacer(1, 10))
+        
+        # Invoice Details Table
+        invoice_details = [
+            ['Invoice Number:', invoice.invoice_number],
+            ['Invoice Date:', format_date(invoice.invoice_date)],
+            ['PO Number:', invoice.po_number or ''],
+            ['PO Date:', format_date(invoice.po_date)],
+            ['Payment Mode:', invoice.payment_mode or ''],
+            ['Transport:', invoice.transport or ''],
+            ['Dispatch From:', invoice.dispatch_from or '']
+        ]
+        
+        # Customer details
+        if customer:
+            invoice_details.extend([
+                ['', ''],  # Empty row
+                ['Bill To:', ''],
+                ['Customer:', customer.name],
+                ['Address:', customer.address or ''],
+                ['City, State:', f"{customer.city or ''}, {customer.state or ''}"],
+                ['PIN Code:', customer.pincode or ''],
+                ['GSTIN:', customer.gstin or ''],
+                ['Contact Person:', customer.contact_person or ''],
+                ['Phone:', customer.phone or '']
+            ])
+        
+        invoice_table = Table(invoice_details, colWidths=[2*inch, 4*inch])
+        invoice_table.setStyle(DETAILS_TABLE_STYLE)
+        
+        story.append(invoice_table)
+        story.append(Spacer(1, 20))
+        
+        # Items Table
+        if invoice.items:
+            # Table headers
+            headers = ['S.No.', 'Description', 'HSN', 'Qty', 'Unit', 'Rate', 'Discount %', 'Amount']
+            items_data = [headers] + [_invoice_item_row(i, item) for i, item in enumerate(invoice.items, 1)]
+            
+            # Add totals
+            items_data.extend([
+                ['', '', '', '', '', '', 'Subtotal:', format_currency(invoice.subtotal)],
+                ['', '', '', '', '', '', 'GST (18%):', format_currency(invoice.gst_amount)],
+                ['', '', '', '', '', '', 'Total:', format_currency(invoice.total_amount)]
+            ])
+            
+            items_table = Table(items_data, colWidths=[0.5*inch, 2.5*inch, 0.8*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch, 1.2*inch])
+            items_table.setStyle(ITEMS_TABLE_STYLE)
+            
+            story.append(items_table)
+            story.append(Spacer(1, 20))
+        
+        # Amount in words
+        if invoice.total_amount:
+            amount_words = _amount_in_words(round(float(invoice.total_amount) * 100))
+            story.append(Paragraph(f"<b>Amount in Words:</b> {amount_words} Rupees Only", NORMAL_STYLE))
+            story.append(Spacer(1, 20))
+        
+        # Banking details
+        if company and company.bank_name:
+            story.append(Paragraph("<b>Banking Details:</b>", HEADING_STYLE))
+            banking_details = [
+                ['Bank Name:', company.bank_name],
+                ['Account Number:', company.account_number or ''],
+                ['IFSC Code:', company.ifsc_code or '']
             ]
             
-            for term in terms:
-                style = heading_style if term.startswith('Terms') else normal_style
-                story.append(Paragraph(term, style))
-            
-            story.append(Spacer(1, 30))
-            
-            # Signature
-            story.append(Paragraph("<b>For " + (company.name if company else "Company") + "</b>", normal_style))
-            story.append(Spacer(1, 50))
-            story.append(Paragraph("Authorized Signatory", normal_style))
-            
-            # Build PDF
-            doc.build(story)
+            banking_table = Table(banking_details, colWidths=[2*inch, 4*inch])
+            banking_table.setStyle(DETAILS_TABLE_STYLE)
             
-            buffer.seek(0)
-            return buffer
+            story.append(banking_table)
+            story.append(Spacer(1, 20))
+        
+        # Terms and conditions
+        story.extend(map(copy, TERMS_PARAGRAPHS))
+        
+        story.append(Spacer(1, 30))
+        
+        # Signature
+        story.append(Paragraph("<b>For " + (company.name if company else "Company") + "</b>", NORMAL_STYLE))
+        story.append(Spacer(1, 50))
+        story.append(copy(SIGNATORY_PARAGRAPH))
+        
+        return story
+    
+    def generate_invoices_pdf_batch(self, invoices, company=None, max_workers=None):
+        """Generate PDFs for many invoices in parallel worker processes; eager-load items and customers to avoid per-invoice queries"""
+        try:
+            # Workers cannot reach the database session, so hand them plain copies of everything rendered
+            snapshots, customers = [], []
+            for invoice in invoices:
+                items = []
+                for item in invoice.items:
+                    item_snapshot = snapshot(item)
+                    item_snapshot.product = snapshot(item.product)
+                    items.append(item_snapshot)
+                invoice_snapshot = snapshot(invoice)
+                invoice_snapshot.items = items
+                snapshots.append(invoice_snapshot)
+                customers.append(snapshot(invoice.customer))
+            
+            args = (repeat(self.output_dir), snapshots, repeat(snapshot(company)), customers)
+            
+            # Starting workers and pickling the snapshots only pays off with several invoices to spread out
+            if len(snapshots) < 2 or max_workers == 1:
+                return list(map(_render_invoice_pdf, *args))
+            
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                return list(executor.map(_render_invoice_pdf, *args, chunksize=4))
             
         except Exception as e:
-            raise Exception(f"Error generating PDF buffer: {str(e)}")
+            raise Exception(f"Error generating PDF batch: {str(e)}")
     
     def generate_report_pdf(self, title, data, headers=None, filename=None):
         """Generate a generic report PDF"""
@@ -463,19 +328,8 @@ class PDFGenerator:
             doc = SimpleDocTemplate(filepath, pagesize=A4, topMargin=0.5*inch)
             story = []
             
-            # Get styles
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                textColor=blue,
-                alignment=TA_CENTER,
-                spaceAfter=20
-            )
-            
             # Title
-            story.append(Paragraph(title, title_style))
+            story.append(Paragraph(title, REPORT_TITLE_STYLE))
             story.append(Spacer(1, 20))
             
             # Data table
@@ -486,23 +340,14 @@ class PDFGenerator:
                     table_data = data
                 
                 table = Table(table_data)
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 12),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
+                table.setStyle(REPORT_TABLE_STYLE)
                 
                 story.append(table)
             
             # Generated timestamp
             story.append(Spacer(1, 30))
             story.append(Paragraph(f"Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}", 
-                                 styles['Normal']))
+                                 NORMAL_STYLE))
             
             # Build PDF
             doc.build(story)
@@ -510,4 +355,16 @@ class PDFGenerator:
             return filepath
             
         except Exception as e:
-            raise Exception(f"Error generating report PDF: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error generating report PDF: {str(e)}")
+
+@lru_cache(maxsize=16)
+def _shared_pdf_generator(output_dir):
+    """Build the PDF generator shared by every caller writing to output_dir"""
+    return PDFGenerator(output_dir)
+
+def get_pdf_generator(output_dir='generated_files'):
+    """Get the shared PDF generator for an output directory"""
+    generator = _shared_pdf_generator(output_dir)
+    # The directory may have been removed since the generator was first built
+    generator.ensure_output_dir()
+    return generator
@@ -0,0 +1,14 @@
+"""
+Model Snapshots
+Plain copies of model rows for work done away from the database session
+"""
+
+from types import SimpleNamespace
+from sqlalchemy import inspect
+
+def snapshot(obj):
+    """Copy a model's column values into a plain namespace that pickles without a session"""
+    state = inspect(obj, raiseerr=False) if obj is not None else None
+    if state is None:
+        return obj
+    return SimpleNamespace(**{attr.key: getattr(obj, attr.key) for attr in state.mapper.column_attrs})